@@ -1,76 +1,301 @@
 import os
 import json
+import logging
 import random
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+import threading
+import time
+import uuid
+from flask import (
+    Flask, Response, flash, jsonify, redirect, render_template, request, session,
+    stream_with_context, url_for,
+)
+
+from quiz_app.set_cache import SET_CACHE, load_set
+from quiz_app.quiz_store import create_store
+from quiz_app.catalog import SetCatalog
+from quiz_app import bulk, journal
+from quiz_app.ingest import EmptyUpload, UploadError, ingest_text_upload
+from quiz_app.scheduler import ScheduleStore, Scheduler, card_key
+from quiz_app.card_stats import CardStatsStore
+from quiz_app.results_store import ResultsStore
+from quiz_app.analytics import PASS_PERCENT, Analytics
+from quiz_app.grading import PreparedDeck
+from quiz_app.search import SearchIndex
+from quiz_app.metrics import METRICS, init_app as init_metrics
+from quiz_app.interprocess import ChangeFeed, FileLock
+from quiz_app.cards import DeckView, Flashcard
+from quiz_app.deck_session import DeckSession, new_seed
+from quiz_app.preparsed import file_signature, set_signature
+from quiz_app.watcher import SetWatcher
+from quiz_app.page_cache import PageCache, http_date, not_modified, page_etag
 
 app = Flask(__name__)
-app.secret_key = "BabsonSeniors"
-
-SETS_FOLDER = "flashcard_sets"  # Folder to store question sets and saved for later 
+# Every worker must sign sessions with the same key; serve.py refuses to start without SECRET_KEY
+app.secret_key = os.environ.get("SECRET_KEY", "BabsonSeniors")
+
+# Where in-progress quizzes are kept: "memory" or "sqlite:///path/to/file.db".
+# The session cookie only holds the quiz id.
+app.config["QUIZ_STORE"] = os.environ.get("QUIZ_STORE", "memory")
+quiz_store = create_store(app.config["QUIZ_STORE"])
+
+# Per-user spaced-repetition state (which cards are due, which are weak)
+schedule_store = ScheduleStore()
+# Per-user, per-card answer counts (buffered, written in batches)
+card_stats = CardStatsStore()
+# Every finished round, plus running per-set and per-card summaries for /dashboard
+results_store = ResultsStore()
+analytics = Analytics()
+
+# How forgiving answer checking is for sets that don't choose for themselves:
+# "exact", "normal" or "lenient" (see quiz_app/grading.py)
+app.config["GRADING_STRICTNESS"] = os.environ.get("GRADING_STRICTNESS", "normal")
+
+# Card order comes from a seed saved with each quiz, so a student's order can be
+# replayed with `python -m quiz_app.deck_session`. Set QUIZ_SEED to give every
+# quiz the same seed while debugging.
+app.config["QUIZ_SEED"] = os.environ.get("QUIZ_SEED")
+
+# Every quiz start is appended to QUIZ_REPLAY_LOG as one JSON line: the set, its
+# size, the seed and the practiced cards put first and last, which is everything
+# deck_session needs to replay the first round. Set it to "" to turn this off.
+app.config["QUIZ_REPLAY_LOG"] = os.environ.get(
+    "QUIZ_REPLAY_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_app", "quiz_replay.log"),
+)
+replay_log = logging.getLogger("flashcard.replay")
+replay_log.setLevel(logging.INFO)
+replay_log.propagate = False
+if app.config["QUIZ_REPLAY_LOG"] and not replay_log.handlers:
+    replay_handler = logging.FileHandler(app.config["QUIZ_REPLAY_LOG"], encoding="utf-8")
+    replay_handler.setFormatter(logging.Formatter("%(message)s"))
+    replay_log.addHandler(replay_handler)
+
+# Largest .txt set that can be uploaded; the request body limit adds room for the form
+app.config["MAX_UPLOAD_BYTES"] = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+app.config["MAX_CONTENT_LENGTH"] = app.config["MAX_UPLOAD_BYTES"] + 64 * 1024
+
+SETS_FOLDER = os.environ.get("SETS_FOLDER", "flashcard_sets")  # Folder to store question sets and saved for later 
 os.makedirs(SETS_FOLDER, exist_ok=True)
 
-# Questions are loaded from text or JSON files and they are being recognized by the question marks 
-def load_questions(file_path):
-    """Load questions from a .txt or .json file into a list of dicts."""
+# Set files written by any worker process are announced here, so every worker drops
+# its cached copy on its next request
+changes = ChangeFeed(os.path.join(SETS_FOLDER, ".catalog", "changes.log"))
+
+@app.before_request
+def apply_changes_from_other_workers():
+    changed = changes.poll()
+    if changed is None:
+        SET_CACHE.clear()
+        return
+    for path in changed:
+        SET_CACHE.invalidate(path)
+
+# Catalog of available sets, used instead of scanning the folder on every request
+catalog = SetCatalog(SETS_FOLDER)
+SETS_PER_PAGE = 50
+
+# The CLI's question files are searchable too
+QUIZ_APP_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_app")
+EXTRA_SEARCH_FILES = [
+    ("questions.txt", os.path.join(QUIZ_APP_FOLDER, "questions.txt")),
+    ("manual_questions_log.txt", os.path.join(QUIZ_APP_FOLDER, "manual_questions_log.txt")),
+]
+
+def searchable_files():
+    files = [(e["name"], os.path.join(SETS_FOLDER, e["file"])) for e in catalog.entries()]
+    return files + [(label, path) for label, path in EXTRA_SEARCH_FILES if os.path.exists(path)]
+
+# Inverted index over every question; only changed files are re-indexed
+search_index = SearchIndex(searchable_files)
+
+# Sets changed outside the app (copied in by hand, the CLI's question log) are
+# re-parsed in the background as soon as they change, so no request waits for
+# it. WATCH_SETS=0 turns this off.
+app.config["WATCH_SETS"] = os.environ.get("WATCH_SETS", "1") != "0"
+
+# Last signature of each set announced on the change feed (watcher thread only)
+announced_signatures = {}
+
+def refresh_changed_set(path):
+    """
+    Re-parse a set that changed on disk, update the catalog and search index,
+    and tell the other workers through the change feed.
+    """
+    # Also saves the .deck copy the other workers will load
+    SET_CACHE.refresh(path)
+    if os.path.dirname(path) == os.path.abspath(SETS_FOLDER):
+        entry = catalog.get(os.path.basename(path))
+        if (not os.path.exists(path) or entry is None
+                or (entry["mtime_ns"], entry["size"]) != file_signature(path)):
+            catalog.update(path)
+    # Only real changes: watchdog also reports a set being read
+    try:
+        signature = set_signature(path)
+    except FileNotFoundError:
+        signature = None
+    if announced_signatures.get(path, ()) != signature:
+        announced_signatures[path] = signature
+        changes.publish(path)
+    # The search index is built on the first search; keep it current after that
+    if search_index.reindexed:
+        search_index.refresh()
+
+# One watcher per sets folder, however many workers serve it: the worker that holds
+# watcher.lock runs it. The others check now and then (WATCHER_ELECTION_SECONDS)
+# and take over if that worker has exited.
+WATCHER_ELECTION_SECONDS = 10.0
+watcher_lock = FileLock(os.path.join(SETS_FOLDER, ".catalog", "watcher.lock"))
+watcher_election = threading.Lock()
+next_watcher_election = 0.0
+set_watcher = None
+
+def elect_set_watcher():
+    """Start this worker's set watcher if no other worker is running one."""
+    global set_watcher, next_watcher_election
+    if set_watcher is not None or not app.config["WATCH_SETS"]:
+        return
+    with watcher_election:
+        now = time.monotonic()
+        if set_watcher is not None or now < next_watcher_election:
+            return
+        next_watcher_election = now + WATCHER_ELECTION_SECONDS
+        if not watcher_lock.try_acquire():
+            return
+        set_watcher = SetWatcher(
+            [SETS_FOLDER], refresh_changed_set, files=[path for _, path in EXTRA_SEARCH_FILES]
+        ).start()
+        METRICS.stats("flashcard_set_watcher", set_watcher.stats, set_watcher.STATS_HELP,
+                      set_watcher.STATS_GAUGES)
+
+app.before_request(elect_set_watcher)
+elect_set_watcher()
+
+# Request timings and cache counters at /metrics (Prometheus text format).
+# Set PROFILE_REQUESTS=0.01 to cProfile 1% of requests into PROFILE_DIR.
+init_metrics(app)
+METRICS.stats("flashcard_set_cache", SET_CACHE.stats, SET_CACHE.STATS_HELP, SET_CACHE.STATS_GAUGES)
+
+# Questions are loaded from text or JSON files and they are being recognized by the question marks.
+# Parsed sets are kept in a shared cache and only re-read when the file changes.
+def load_deck(file_path):
+    """Load the cached (question, answer) tuples for a .txt or .json set."""
     if not os.path.exists(file_path):
-        return []
-
-    if file_path.endswith(".txt"):
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines() if line.strip()]
-
-        cards = []
-        i = 0
-        while i < len(lines):
-            if lines[i].endswith("?"):
-                question = lines[i]
-                answer = lines[i + 1] if i + 1 < len(lines) else ""
-                cards.append({"question": question, "answer": answer})
-                i += 2
-            else:
-                i += 1
-        return cards
-    elif file_path.endswith(".json"):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+        return ()
+    if not (file_path.endswith(".txt") or file_path.endswith(".json")):
+        return ()
+    with METRICS.phase("set_load"):
+        return load_set(file_path).cards
+
+def load_questions(file_path):
+    """Flashcards for a .txt or .json set, created only as they are accessed."""
+    return DeckView(load_deck(file_path))
 
 # Save questions to JSON file
 def save_questions(file_path, cards):
     """Save list of question dicts to JSON."""
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(cards, f, indent=4)
+    SET_CACHE.invalidate(file_path)
+    changes.publish(file_path)
+
+# Pages that look the same for everyone are rendered once per version of what they
+# show and revalidated by browsers and proxies with ETag/Last-Modified (a 304 skips
+# the work entirely). See quiz_app/page_cache.py.
+page_cache = PageCache()
+METRICS.stats("flashcard_page_cache", page_cache.stats, page_cache.STATS_HELP,
+              page_cache.STATS_GAUGES)
+
+def template_version(name):
+    """Version and time of a page that only shows its template: the file's mtime."""
+    mtime = os.path.getmtime(os.path.join(app.root_path, app.template_folder, name))
+    return f"{mtime:.6f}", mtime
+
+def cached_page(version, last_modified, render):
+    """The page at this URL from page_cache (or a 304), rendering it on a miss."""
+    if "_flashes" in session:
+        # Flashed messages are part of the page, so this visitor gets their own copy
+        return render()
+    key = request.full_path
+    etag = page_etag(key, version)
+    if not_modified(request, etag, last_modified):
+        page_cache.count_not_modified()
+        response = app.response_class(status=304)
+    else:
+        body = page_cache.get(key, version)
+        if body is None:
+            body = render()
+            page_cache.put(key, version, body)
+        response = app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.last_modified = http_date(last_modified)
+    # Copies may be kept, but must be checked with the server before each use
+    response.cache_control.no_cache = True
+    return response
 
 
 # Used in the welcome page 
 @app.route("/")
 def home():
-    return render_template("index.html")
+    return cached_page(*template_version("index.html"), lambda: render_template("index.html"))
 
 # Instructions page
 @app.route("/instructions")
 def instructions():
-    return render_template("instructions.html")
+    return cached_page(*template_version("instructions.html"),
+                       lambda: render_template("instructions.html"))
 
-# Questions will be uploaded in txt format 
+# Questions will be uploaded in txt format. The upload is validated while it is read,
+# and a pre-parsed copy is saved so the first quiz on it doesn't pay for parsing.
 @app.route("/upload", methods=["GET", "POST"])
 def upload():
     if request.method == "POST":
         file = request.files.get("file")
         if file and file.filename.endswith(".txt"):
-            set_name = file.filename.replace(".txt", "")
+            set_name = os.path.basename(file.filename)[:-len(".txt")]
             file_path = os.path.join(SETS_FOLDER, f"{set_name}.txt")
-            file.save(file_path)
-            flash(f"Set '{set_name}' uploaded successfully!", "success")
+            try:
+                report = ingest_upload(file.stream, file_path)
+            except EmptyUpload as e:
+                flash("No questions found. Each question must end in '?' with its answer on the next line.", "danger")
+                flash_rejected_lines(e.rejected, len(e.rejected))
+                return render_template("upload.html")
+            except UploadError as e:
+                flash(str(e), "danger")
+                return render_template("upload.html")
+
+            SET_CACHE.invalidate(file_path)
+            changes.publish(file_path)
+            catalog.update(file_path)
+            flash(f"Set '{set_name}' uploaded successfully with {report.cards} questions!", "success")
+            flash_rejected_lines(report.rejected, report.rejected_total)
             return redirect(url_for("select_quiz_set"))
         else:
             flash("Invalid file. Must be a .txt file with questions ending in '?' and answers on the next line.", "danger")
-    return render_template("upload.html")
+            return render_template("upload.html")
+    return cached_page(*template_version("upload.html"), lambda: render_template("upload.html"))
+
+def ingest_upload(stream, file_path):
+    """Validate and write an uploaded set while holding its lock."""
+    with journal.set_lock(file_path):
+        return ingest_text_upload(stream, file_path, app.config["MAX_UPLOAD_BYTES"])
+
+def flash_rejected_lines(rejected, total, shown=5):
+    """Tell the uploader which lines were skipped (first few only)."""
+    if not total:
+        return
+    flash(f"{total} line(s) were skipped:", "warning")
+    for line in rejected[:shown]:
+        flash(f"Line {line.line}: {line.reason} ({line.text[:60]})", "warning")
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    flash(f"File too large. The limit is {app.config['MAX_UPLOAD_BYTES'] // (1024 * 1024)} MB.", "danger")
+    return redirect(url_for("upload"))
 
 # Questions can also be manually added as a new set or an existing one 
 @app.route('/add_question', methods=['GET', 'POST'])
 def add_question():
-    sets = [f.replace('.json', '') for f in os.listdir(SETS_FOLDER) if f.endswith('.json')]
+    sets, _ = catalog.list_sets(fmt="json")
 
     if request.method == 'POST':
         existing_set = request.form.get('existing_set')
@@ -92,42 +317,67 @@ def add_question():
             return redirect(url_for('add_question'))
 
         filepath = os.path.join(SETS_FOLDER, filename)
-
-        # Load or create properly structured JSON
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # If file is a list, convert it to our standard structure
-            if isinstance(data, list):
-                data = {"questions": data}
-        else:
-            data = {"questions": []}
-
-        # Save new question
-        data["questions"].append({
-            "question": question,
-            "answer": answer
-        })
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        append_question(filepath, question, answer)
 
         flash("Question added successfully!", "success")
         return redirect(url_for('add_question'))
 
     return render_template('add_question.html', sets=sets)
 
+# Append the card to the set's journal instead of rewriting the whole file.
+# The set lock keeps the catalog's card count in step with other workers.
+def append_question(filepath, question, answer):
+    with journal.set_lock(filepath):
+        is_new = not os.path.exists(filepath)
+        seq = journal.append_card(filepath, question, answer)
+        if is_new:
+            catalog.update(filepath)
+        else:
+            catalog.add_cards(filepath, 1, seq)
+    changes.publish(filepath)
+
+# Bulk import: POST a .jsonl, .csv or .txt file ("file") and optionally a default "set".
+# Cards are streamed into their sets in batches; the response reports what was imported.
+@app.route("/bulk/import", methods=["POST"])
+def bulk_import():
+    file = request.files.get("file")
+    if not file:
+        return jsonify(error="No file uploaded"), 400
+    try:
+        fmt = request.form.get("format") or bulk.guess_format(file.filename)
+        report = bulk.import_stream(
+            file.stream, fmt, SETS_FOLDER, request.form.get("set"), catalog=catalog, changes=changes
+        )
+    except bulk.BulkError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(
+        sets=report.sets,
+        cards=report.cards,
+        rejected=[line._asdict() for line in report.rejected],
+        rejected_total=report.rejected_total,
+    )
+
+# Bulk export: /bulk/export?sets=a,b&format=jsonl|csv|txt (all sets by default), streamed
+@app.route("/bulk/export")
+def bulk_export():
+    fmt = request.args.get("format", "jsonl")
+    if fmt not in bulk.FORMATS:
+        return jsonify(error=f"Unknown format: {fmt}"), 400
+    names = request.args.get("sets")
+    try:
+        sets = bulk.catalog_sets(catalog, [n.strip() for n in names.split(",")] if names else None)
+    except bulk.BulkError as e:
+        return jsonify(error=str(e)), 404
+    mimetypes = {"jsonl": "application/x-ndjson", "csv": "text/csv", "txt": "text/plain"}
+    return Response(
+        stream_with_context(bulk.export_chunks(sets, fmt)),
+        mimetype=mimetypes[fmt],
+        headers={"Content-Disposition": f"attachment; filename=flashcards.{fmt}"},
+    )
+
 # Users have the option to select a quiz set 
 @app.route("/select_quiz_set", methods=["GET", "POST"])
 def select_quiz_set():
-    # Get all available sets (.txt)
-    sets = [
-    f.replace(".txt", "").replace(".json", "")
-    for f in os.listdir(SETS_FOLDER)
-    if f.endswith(".txt") or f.endswith(".json")
-]
-
     if request.method == "POST":
         chosen = request.form.get("set_name")
         if chosen:
@@ -135,8 +385,176 @@ def select_quiz_set():
             return redirect(url_for("start_quiz"))
         else:
             flash("Please select a set.", "danger")
+            return render_set_list()
+
+    # Cached per catalog version: until a set is added, changed or removed,
+    # the listing is neither rebuilt nor re-rendered
+    return cached_page(catalog.version_key(), catalog.modified_at(), render_set_list)
+
+def render_set_list():
+    """Available sets (.txt and .json) from the catalog, one page at a time."""
+    prefix = request.args.get("q", "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    sets, total = catalog.list_sets(
+        prefix=prefix, offset=(page - 1) * SETS_PER_PAGE, limit=SETS_PER_PAGE
+    )
+    pages = max(1, -(-total // SETS_PER_PAGE))
+    return render_template(
+        "select_quiz_set.html", sets=sets, q=prefix, page=page, pages=pages, total=total
+    )
+
+# Search every set for a question or answer
+@app.route("/search")
+def search():
+    query = request.args.get("q", "").strip()
+    hits = search_index.search(query) if query else []
+    return render_template("search.html", q=query, hits=hits)
+
+# The quiz in progress lives in the quiz store; the session only remembers its id
+def current_quiz():
+    quiz_id = session.get("quiz_id")
+    if not quiz_id:
+        return None
+    with METRICS.phase("quiz_store"):
+        state = quiz_store.get(quiz_id)
+    if state is not None and "session" not in state:
+        # Saved by an older version of the app, before quizzes had a seeded order
+        end_quiz()
+        return None
+    return state
+
+def save_quiz(state):
+    METRICS.state_bytes.observe(len(json.dumps(state, separators=(",", ":"))))
+    with METRICS.phase("quiz_store"):
+        quiz_store.save(session["quiz_id"], state)
+
+def end_quiz():
+    quiz_id = session.pop("quiz_id", None)
+    if quiz_id:
+        delete_quiz(quiz_id)
+
+# A quiz's first-round split (practiced cards asked first and last) is fixed when
+# it starts, so it is stored once under its own id instead of with every answer
+def split_id(quiz_id):
+    return quiz_id + ".split"
+
+def create_quiz(deck_path, total, deck_session):
+    """Store a new quiz and return its id."""
+    split = deck_session.split()
+    has_split = bool(split["first"] or split["last"])
+    quiz_id = quiz_store.create({
+        "deck": deck_path,
+        "original_total": total,
+        "score": 0,
+        "session": deck_session.state(),
+        "split": has_split,
+    })
+    if has_split:
+        quiz_store.save(split_id(quiz_id), split)
+    return quiz_id
+
+def quiz_session(quiz_id, state):
+    """The quiz's DeckSession, or None if its split has expired from the store."""
+    split = None
+    if state.get("split") and state["session"]["round"] == 1:
+        split = quiz_store.get(split_id(quiz_id))
+        if split is None:
+            return None
+    return DeckSession.from_state(state["session"], split)
+
+def delete_quiz(quiz_id):
+    quiz_store.delete(quiz_id)
+    quiz_store.delete(split_id(quiz_id))
+
+# Each browser gets an anonymous id so card scheduling can be remembered
+def current_user():
+    if "user_id" not in session:
+        session["user_id"] = uuid.uuid4().hex
+        session.permanent = True
+    return session["user_id"]
+
+def deck_keys(deck_path):
+    """Scheduler keys for every card in a set, computed once per parsed set."""
+    return load_set(deck_path).derived(
+        "card_keys", lambda cards: [card_key(q, a) for q, a in cards]
+    )
+
+def prepared_answers(deck_path):
+    """Normalized answers for a set, kept with the cached set and reused per submission."""
+    parsed = load_set(deck_path)
+    strictness = parsed.meta.get("strictness", app.config["GRADING_STRICTNESS"])
+    return parsed.derived(
+        "answers",
+        lambda cards: PreparedDeck(cards, strictness, parsed.meta.get("aliases")),
+    )
+
+def deck_key_index(deck_path):
+    """Card indices by scheduler key, for finding a user's practiced cards in a set."""
+    def build(cards):
+        index = {}
+        for i, key in enumerate(deck_keys(deck_path)):
+            index.setdefault(key, []).append(i)
+        return index
+    return load_set(deck_path).derived("key_index", build)
+
+def start_session(deck_path, size, user=None):
+    """
+    A new quiz over a set: practiced cards that are due (weakest first), then
+    every card never practiced in seeded random order, then cards not due yet.
+    Only the user's practiced cards are looked at; the rest is a permutation.
+    """
+    user = user or current_user()
+    seed = app.config["QUIZ_SEED"]
+    seed = int(seed) if seed else new_seed()
+    keys = deck_keys(deck_path)
+    key_index = deck_key_index(deck_path)
+    states = {key: s for key, s in schedule_store.user_states(user).items() if key in key_index}
+    practiced = [i for key in states for i in key_index[key]]
+    first, last = Scheduler(keys, states, random.Random(seed)).split_practiced(practiced)
+    replay_log.info("%s", json.dumps({
+        "at": round(time.time(), 3), "user": user, "set": deck_path,
+        "size": size, "seed": seed, "first": first, "last": last,
+    }))
+    return DeckSession.start(size, seed, first, last)
+
+def set_name_of(deck_path):
+    return os.path.splitext(os.path.basename(deck_path))[0]
+
+def record_review(deck_path, index, correct, user=None):
+    user = user or current_user()
+    key = deck_keys(deck_path)[index]
+    card_stats.record(user, key, correct)
+    analytics.record_answer(set_name_of(deck_path), key, load_set(deck_path).cards[index][0], correct)
+    states = schedule_store.load(user, [key])
+    scheduler = Scheduler([key], states)
+    scheduler.review(0, correct)
+    schedule_store.record(user, scheduler.take_reviewed())
+
+def record_round(state, deck_session):
+    """
+    Save a finished round to the set's history and running summary. The quiz
+    passes at the first round that brings the score to PASS_PERCENT.
+    """
+    total = deck_session.total
+    correct = total - len(deck_session.misses)
+    passed = (not state.get("passed")
+              and state["score"] * 100 >= PASS_PERCENT * state["original_total"])
+    if passed:
+        state["passed"] = True
+    results_store.append(set_name_of(state["deck"]), deck_session.round, total, correct,
+                         correct * 100 / total, passed=passed)
+
+def dashboard_data(quiz=""):
+    """Everything the dashboard shows; a few summary rows however long the history is."""
+    detail = analytics.quiz(quiz) if quiz else None
+    return {
+        "summaries": analytics.quizzes(limit=50),
+        "quiz": quiz,
+        "detail": detail,
+        "hardest": analytics.hardest(quiz) if detail else [],
+        "recent": results_store.recent(quiz) if detail else [],
+    }
 
-    return render_template("select_quiz_set.html", sets=sets)
 # When the quiz starts, the questions are randomized 
 @app.route("/start", methods=["GET"])
 def start_quiz():
@@ -150,21 +568,17 @@ def start_quiz():
 
     file_path = txt_path if os.path.exists(txt_path) else json_path
 
-    cards = load_questions(file_path)
-
-    # Convert {"questions": [...]} to list
-    if isinstance(cards, dict) and "questions" in cards:
-        cards = cards["questions"]
+    cards = load_deck(file_path)
 
     if not cards:
         flash("This set has no questions or the format is incorrect.", "danger")
         return redirect(url_for("select_quiz_set"))
-    random.shuffle(cards)
-    session["original_total"] = len(cards)
-    session["quiz_pool"] = cards
-    session["index"] = 0
-    session["score"] = 0
-    session["wrong_questions"] = []
+
+    # The order is a seeded permutation of card indices; nothing is copied or shuffled
+    deck_session = start_session(file_path, len(cards))
+
+    end_quiz()
+    session["quiz_id"] = create_quiz(file_path, len(cards), deck_session)
 
     return redirect(url_for("question"))
 
@@ -173,69 +587,88 @@ def start_quiz():
 # will be repeated until all the questions are answered correctly. 
 @app.route("/question", methods=["GET", "POST"])
 def question():
-    index = session.get("index", 0)
-    pool = session.get("quiz_pool", [])
-    wrong_questions = session.get("wrong_questions", [])
+    state = current_quiz()
+    if state is None:
+        return redirect(url_for("result"))
 
-    if not pool or index >= len(pool):
+    with METRICS.phase("quiz_store"):
+        deck_session = quiz_session(session["quiz_id"], state)
+    if deck_session is None:
+        end_quiz()
+        return redirect(url_for("result"))
+    card_index = deck_session.current()
+    if card_index is None:
         return redirect(url_for("result"))
 
-    card = pool[index]
+    cards = load_deck(state["deck"])
+    if card_index >= len(cards):
+        # The set was edited mid-quiz and this card no longer exists
+        end_quiz()
+        flash("This set changed while you were practicing. Please start again.", "warning")
+        return redirect(url_for("select_quiz_set"))
+
+    card = Flashcard(*cards[card_index])
 
     if request.method == "POST":
         action = request.form.get("action")
         if action == "quit":
             flash("Quiz stopped. Returning to home.", "info")
-            session.pop("quiz_pool", None)
-            session.pop("index", None)
-            session.pop("wrong_questions", None)
-            session.pop("score", None)
+            end_quiz()
             return redirect(url_for("home"))
 
         # Otherwise, handle answer submission
         user_answer = request.form.get("answer", "").strip()
-        if user_answer.lower() == card["answer"].lower():
-            session["score"] += 1
+        correct = prepared_answers(state["deck"]).check(card_index, user_answer)
+        if correct:
+            state["score"] += 1
             flash("✅ Correct!", "success")
         else:
-            flash(f"❌ Incorrect! Correct answer: {card['answer']}", "danger")
-            wrong_questions.append(card)
-
-        session["index"] = index + 1
-        session["wrong_questions"] = wrong_questions
+            flash(f"❌ Incorrect! Correct answer: {card.answer}", "danger")
+        record_review(state["deck"], card_index, correct)
+        deck_session.answer(correct)
 
         # Repeat missed questions if at end
-        if session["index"] >= len(pool):
-            if wrong_questions:
+        if deck_session.finished:
+            record_round(state, deck_session)
+            if deck_session.next_round():
                 flash("Repeating missed questions...", "info")
-                session["quiz_pool"] = wrong_questions
-                session["index"] = 0
-                session["wrong_questions"] = []
             else:
+                state["session"] = deck_session.state()
+                save_quiz(state)
                 return redirect(url_for("result"))
 
+        state["session"] = deck_session.state()
+        save_quiz(state)
         return redirect(url_for("question"))
 
-    return render_template("question.html", card=card, current=index + 1, total=len(pool))
+    return render_template("question.html", card=card,
+                           current=deck_session.position + 1, total=deck_session.total)
 
 # Shows the results at the end of the quiz 
 @app.route("/result")
 def result():
-    score = session.get("score", 0)
-    total = session.get("original_total", 0)
+    state = current_quiz() or {}
+    score = state.get("score", 0)
+    total = state.get("original_total", 0)
     percent = (score / total) * 100 if total > 0 else 0
 
-    wrong_questions = session.get("wrong_questions", [])
+    deck_session = quiz_session(session["quiz_id"], state) if state else None
 
-    if percent < 80 and wrong_questions:
+    if percent < 80 and deck_session and deck_session.next_round():
         flash(f"Score below 80% ({percent:.1f}%). Starting another practice round!", "warning")
-        session["quiz_pool"] = wrong_questions
-        session["index"] = 0
-        session["score"] = 0
-        session["wrong_questions"] = []
+        state["score"] = 0
+        state["session"] = deck_session.state()
+        save_quiz(state)
         return redirect(url_for("question"))
 
-    session.clear()
+    # Only the quiz is over: user_id stays, so scheduling and stats carry over
+    end_quiz()
+    session.pop("quiz_set", None)
     return render_template("result.html", score=score, total=total, percent=percent)
+
+# Averages, pass rates and hardest cards per set, from running summaries
+@app.route("/dashboard")
+def dashboard():
+    return render_template("dashboard.html", **dashboard_data(request.args.get("quiz", "").strip()))
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,350 @@
+"""
+Asyncio (ASGI) version of the web app, for bursts of many students at once.
+
+Same routes, templates, sets folder and stores as app.py, served by Quart
+(pip install quart) under an ASGI server:
+
+    SECRET_KEY=... WORKERS=4 hypercorn asgi:app --workers 4
+    SECRET_KEY=... WORKERS=4 uvicorn asgi:app --workers 4
+
+As with serve.py, in-progress quizzes are kept in SQLite (QUIZ_STORE,
+default quiz_app/quiz_state.db) so any worker can serve any request.
+QUIZ_STORE=memory is refused when WORKERS (or uvicorn's WEB_CONCURRENCY)
+says there is more than one worker.
+
+Routes never touch the disk on the event loop: loading sets, SQLite and
+file writes run in worker threads (asyncio.to_thread). Concurrent requests
+for the same set share one load (CoalescingLoader), so a class starting the
+same quiz at once costs one read of the set.
+"""
+
+import asyncio
+import os
+import uuid
+
+from quart import Quart, render_template, request, redirect, url_for, session, flash
+
+from serve import configure_quiz_store
+
+# Must happen before app.py creates its quiz store
+configure_quiz_store(int(os.environ.get("WORKERS") or os.environ.get("WEB_CONCURRENCY") or 1))
+
+import app as wsgi  # noqa: E402
+from quiz_app.async_loader import CoalescingLoader
+from quiz_app.cards import Flashcard
+from quiz_app.ingest import EmptyUpload, UploadError
+from quiz_app.page_cache import http_date, not_modified, page_etag
+from quiz_app.set_cache import SET_CACHE
+
+app = Quart(__name__)
+app.secret_key = wsgi.app.secret_key
+app.config["MAX_UPLOAD_BYTES"] = wsgi.app.config["MAX_UPLOAD_BYTES"]
+app.config["MAX_CONTENT_LENGTH"] = wsgi.app.config["MAX_CONTENT_LENGTH"]
+
+SETS_FOLDER = wsgi.SETS_FOLDER
+catalog = wsgi.catalog
+quiz_store = wsgi.quiz_store
+
+# One in-flight read per set, however many requests want it
+deck_loader = CoalescingLoader(wsgi.load_deck)
+
+async def load_deck(file_path):
+    return await deck_loader.get(os.path.abspath(file_path))
+
+# Sets written by other workers (WSGI or ASGI) are dropped from the cache
+@app.before_request
+async def apply_changes_from_other_workers():
+    wsgi.elect_set_watcher()
+    changed = await asyncio.to_thread(wsgi.changes.poll)
+    if changed is None:
+        SET_CACHE.clear()
+        return
+    for path in changed:
+        SET_CACHE.invalidate(path)
+
+# Shared pages come from the same rendered-page cache as app.py, with 304s
+page_cache = wsgi.page_cache
+
+async def cached_page(version, last_modified, render):
+    """The page at this URL from page_cache (or a 304), rendering it on a miss."""
+    if "_flashes" in session:
+        # Flashed messages are part of the page, so this visitor gets their own copy
+        return await render()
+    key = request.full_path
+    etag = page_etag(key, version)
+    if not_modified(request, etag, last_modified):
+        page_cache.count_not_modified()
+        response = app.response_class("", status=304)
+    else:
+        body = page_cache.get(key, version)
+        if body is None:
+            body = await render()
+            page_cache.put(key, version, body)
+        response = app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.last_modified = http_date(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+# Used in the welcome page
+@app.route("/")
+async def home():
+    return await cached_page(*wsgi.template_version("index.html"),
+                             lambda: render_template("index.html"))
+
+# Instructions page
+@app.route("/instructions")
+async def instructions():
+    return await cached_page(*wsgi.template_version("instructions.html"),
+                             lambda: render_template("instructions.html"))
+
+# Uploads are validated and written in a worker thread while the loop keeps serving
+@app.route("/upload", methods=["GET", "POST"])
+async def upload():
+    if request.method == "POST":
+        files = await request.files
+        file = files.get("file")
+        if file and file.filename.endswith(".txt"):
+            set_name = os.path.basename(file.filename)[:-len(".txt")]
+            file_path = os.path.join(SETS_FOLDER, f"{set_name}.txt")
+            try:
+                report = await asyncio.to_thread(wsgi.ingest_upload, file.stream, file_path)
+            except EmptyUpload as e:
+                await flash("No questions found. Each question must end in '?' with its answer on the next line.", "danger")
+                await flash_rejected_lines(e.rejected, len(e.rejected))
+                return await render_template("upload.html")
+            except UploadError as e:
+                await flash(str(e), "danger")
+                return await render_template("upload.html")
+
+            SET_CACHE.invalidate(file_path)
+            await asyncio.to_thread(wsgi.changes.publish, file_path)
+            await asyncio.to_thread(catalog.update, file_path)
+            await flash(f"Set '{set_name}' uploaded successfully with {report.cards} questions!", "success")
+            await flash_rejected_lines(report.rejected, report.rejected_total)
+            return redirect(url_for("select_quiz_set"))
+        else:
+            await flash("Invalid file. Must be a .txt file with questions ending in '?' and answers on the next line.", "danger")
+            return await render_template("upload.html")
+    return await cached_page(*wsgi.template_version("upload.html"),
+                             lambda: render_template("upload.html"))
+
+async def flash_rejected_lines(rejected, total, shown=5):
+    """Tell the uploader which lines were skipped (first few only)."""
+    if not total:
+        return
+    await flash(f"{total} line(s) were skipped:", "warning")
+    for line in rejected[:shown]:
+        await flash(f"Line {line.line}: {line.reason} ({line.text[:60]})", "warning")
+
+@app.errorhandler(413)
+async def upload_too_large(error):
+    await flash(f"File too large. The limit is {app.config['MAX_UPLOAD_BYTES'] // (1024 * 1024)} MB.", "danger")
+    return redirect(url_for("upload"))
+
+# Questions can also be manually added as a new set or an existing one
+@app.route("/add_question", methods=["GET", "POST"])
+async def add_question():
+    sets, _ = await asyncio.to_thread(catalog.list_sets, fmt="json")
+
+    if request.method == "POST":
+        form = await request.form
+        existing_set = form.get("existing_set")
+        new_set_name = form.get("new_set_name", "").strip()
+        question = form.get("question", "").strip()
+        answer = form.get("answer", "").strip()
+
+        if not question or not answer:
+            await flash("Question and answer required!", "danger")
+            return redirect(url_for("add_question"))
+
+        # Determine filename
+        if new_set_name:
+            filename = f"{new_set_name}.json"
+        elif existing_set:
+            filename = f"{existing_set}.json"
+        else:
+            await flash("Please select or name a set.", "danger")
+            return redirect(url_for("add_question"))
+
+        filepath = os.path.join(SETS_FOLDER, filename)
+        await asyncio.to_thread(wsgi.append_question, filepath, question, answer)
+
+        await flash("Question added successfully!", "success")
+        return redirect(url_for("add_question"))
+
+    return await render_template("add_question.html", sets=sets)
+
+# Users have the option to select a quiz set
+@app.route("/select_quiz_set", methods=["GET", "POST"])
+async def select_quiz_set():
+    if request.method == "POST":
+        form = await request.form
+        chosen = form.get("set_name")
+        if chosen:
+            session["quiz_set"] = chosen
+            return redirect(url_for("start_quiz"))
+        else:
+            await flash("Please select a set.", "danger")
+            return await render_set_list()
+
+    # Cached per catalog version, like app.py
+    version = await asyncio.to_thread(catalog.version_key)
+    return await cached_page(version, catalog.modified_at(), render_set_list)
+
+async def render_set_list():
+    prefix = request.args.get("q", "").strip()
+    page = max(1, request.args.get("page", 1, type=int))
+    sets, total = await asyncio.to_thread(
+        catalog.list_sets, prefix=prefix,
+        offset=(page - 1) * wsgi.SETS_PER_PAGE, limit=wsgi.SETS_PER_PAGE,
+    )
+    pages = max(1, -(-total // wsgi.SETS_PER_PAGE))
+    return await render_template(
+        "select_quiz_set.html", sets=sets, q=prefix, page=page, pages=pages, total=total
+    )
+
+# Search every set for a question or answer
+@app.route("/search")
+async def search():
+    query = request.args.get("q", "").strip()
+    hits = await asyncio.to_thread(wsgi.search_index.search, query) if query else []
+    return await render_template("search.html", q=query, hits=hits)
+
+# The quiz in progress lives in the shared quiz store; the session only remembers its id
+async def current_quiz():
+    quiz_id = session.get("quiz_id")
+    if not quiz_id:
+        return None
+    state = await asyncio.to_thread(quiz_store.get, quiz_id)
+    if state is not None and "session" not in state:
+        await end_quiz()
+        return None
+    return state
+
+async def end_quiz():
+    quiz_id = session.pop("quiz_id", None)
+    if quiz_id:
+        await asyncio.to_thread(wsgi.delete_quiz, quiz_id)
+
+def current_user():
+    if "user_id" not in session:
+        session["user_id"] = uuid.uuid4().hex
+        session.permanent = True
+    return session["user_id"]
+
+# When the quiz starts, the questions are randomized
+@app.route("/start", methods=["GET"])
+async def start_quiz():
+    set_name = session.get("quiz_set")
+    if not set_name:
+        await flash("Please select a set first.", "warning")
+        return redirect(url_for("select_quiz_set"))
+
+    txt_path = os.path.join(SETS_FOLDER, f"{set_name}.txt")
+    json_path = os.path.join(SETS_FOLDER, f"{set_name}.json")
+    file_path = txt_path if await asyncio.to_thread(os.path.exists, txt_path) else json_path
+
+    cards = await load_deck(file_path)
+    if not cards:
+        await flash("This set has no questions or the format is incorrect.", "danger")
+        return redirect(url_for("select_quiz_set"))
+
+    deck_session = await asyncio.to_thread(wsgi.start_session, file_path, len(cards), current_user())
+
+    await end_quiz()
+    session["quiz_id"] = await asyncio.to_thread(
+        wsgi.create_quiz, file_path, len(cards), deck_session
+    )
+    return redirect(url_for("question"))
+
+# Answer questions; missed questions are repeated at the end of the pool
+@app.route("/question", methods=["GET", "POST"])
+async def question():
+    state = await current_quiz()
+    if state is None:
+        return redirect(url_for("result"))
+
+    deck_session = await asyncio.to_thread(wsgi.quiz_session, session["quiz_id"], state)
+    if deck_session is None:
+        await end_quiz()
+        return redirect(url_for("result"))
+    card_index = deck_session.current()
+    if card_index is None:
+        return redirect(url_for("result"))
+
+    cards = await load_deck(state["deck"])
+    if card_index >= len(cards):
+        await end_quiz()
+        await flash("This set changed while you were practicing. Please start again.", "warning")
+        return redirect(url_for("select_quiz_set"))
+
+    card = Flashcard(*cards[card_index])
+
+    if request.method == "POST":
+        form = await request.form
+        if form.get("action") == "quit":
+            await flash("Quiz stopped. Returning to home.", "info")
+            await end_quiz()
+            return redirect(url_for("home"))
+
+        user_answer = form.get("answer", "").strip()
+        user = current_user()
+        answers = await asyncio.to_thread(wsgi.prepared_answers, state["deck"])
+        correct = answers.check(card_index, user_answer)
+        if correct:
+            state["score"] += 1
+            await flash("✅ Correct!", "success")
+        else:
+            await flash(f"❌ Incorrect! Correct answer: {card.answer}", "danger")
+        await asyncio.to_thread(wsgi.record_review, state["deck"], card_index, correct, user)
+        deck_session.answer(correct)
+
+        # Repeat missed questions if at end; the next round is just the misses
+        if deck_session.finished:
+            await asyncio.to_thread(wsgi.record_round, state, deck_session)
+        if deck_session.finished and deck_session.next_round():
+            await flash("Repeating missed questions...", "info")
+        state["session"] = deck_session.state()
+        await asyncio.to_thread(quiz_store.save, session["quiz_id"], state)
+        if deck_session.finished:
+            return redirect(url_for("result"))
+        return redirect(url_for("question"))
+
+    return await render_template("question.html", card=card,
+                                 current=deck_session.position + 1, total=deck_session.total)
+
+# Shows the results at the end of the quiz
+@app.route("/result")
+async def result():
+    state = await current_quiz() or {}
+    score = state.get("score", 0)
+    total = state.get("original_total", 0)
+    percent = (score / total) * 100 if total > 0 else 0
+
+    deck_session = (await asyncio.to_thread(wsgi.quiz_session, session["quiz_id"], state)
+                    if state else None)
+
+    if percent < 80 and deck_session and deck_session.next_round():
+        await flash(f"Score below 80% ({percent:.1f}%). Starting another practice round!", "warning")
+        state["score"] = 0
+        state["session"] = deck_session.state()
+        await asyncio.to_thread(quiz_store.save, session["quiz_id"], state)
+        return redirect(url_for("question"))
+
+    # Only the quiz is over: user_id stays, so scheduling and stats carry over
+    await end_quiz()
+    session.pop("quiz_set", None)
+    return await render_template("result.html", score=score, total=total, percent=percent)
+
+# Averages, pass rates and hardest cards per set, from running summaries
+@app.route("/dashboard")
+async def dashboard():
+    quiz = request.args.get("quiz", "").strip()
+    data = await asyncio.to_thread(wsgi.dashboard_data, quiz)
+    return await render_template("dashboard.html", **data)
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -0,0 +1,234 @@
+"""
+Benchmarks for the loading, quiz and results hot paths.
+
+Generates synthetic decks (10^2 to 10^6 cards by default) in a temporary
+folder and times:
+
+  parse        parsing a .txt set from scratch (parse_source)
+  deck_open    opening its pre-parsed binary .deck copy
+  cache_hit    load_set() on an already cached set
+  session      starting a seeded quiz order over a deck and drawing the
+               first 100 cards (what replaced build_question_pool)
+  start        GET /start through Flask's test client
+  answer       POST /question through Flask's test client, per request
+  results      appending a round result and reading a quiz's history
+
+Nothing in the repository is touched: the web app runs against the
+temporary folder and its own SQLite file.
+
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --sizes 100,10000 --compare bench.json
+
+With --compare, each timing is shown next to the baseline's and the exit
+status is 1 if any got slower than --tolerance allows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+
+
+def write_synthetic_deck(path: str, n: int, seed: int = 0) -> None:
+    """A .txt set of n cards in the upload format (question? / answer / blank)."""
+    rng = random.Random(seed)
+    words = ["capital", "river", "author", "element", "planet", "founder",
+             "painter", "language", "country", "symbol", "mountain", "century"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            a, b = rng.choice(words), rng.choice(words)
+            f.write(f"What is the {a} of {b} number {i}?\n")
+            f.write(f"answer {i}\n\n")
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Run fn repeat times and summarize the wall-clock seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def summarize(times: List[float]) -> Dict[str, Any]:
+    ordered = sorted(times)
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run(sizes: List[int], repeat: int, requests: int) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="flashcard-bench-")
+    # The app and its stores read these at import time
+    os.environ["QUIZ_DATA_DB"] = os.path.join(workdir, "bench.db")
+    os.environ["QUIZ_REPLAY_LOG"] = os.path.join(workdir, "quiz_replay.log")
+    os.environ.setdefault("QUIZ_STORE", "memory")
+    # Writing the synthetic decks must not start background re-parses mid-timing
+    os.environ.setdefault("WATCH_SETS", "0")
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    import app as webapp
+    from quiz_app.set_cache import SET_CACHE, convert_to_deck, load_set, parse_source
+    from quiz_app.preparsed import read_preparsed
+    from quiz_app.deck_session import DeckSession
+    from quiz_app.results_store import ResultsStore
+
+    webapp.app.config["TESTING"] = True
+    client = webapp.app.test_client()
+    results_db = ResultsStore(os.path.join(workdir, "results.db"))
+
+    report: Dict[str, Any] = {}
+    for n in sizes:
+        name = f"bench_{n}"
+        path = os.path.join(webapp.SETS_FOLDER, f"{name}.txt")
+        write_synthetic_deck(path, n)
+        webapp.catalog.update(path)
+        print(f"-- {n} cards", file=sys.stderr)
+
+        report[f"parse/{n}"] = timed(lambda: parse_source(path), repeat)
+
+        convert_to_deck(path)
+
+        def open_deck():
+            deck = read_preparsed(path)
+            deck[len(deck) - 1]
+            deck.close()
+
+        report[f"deck_open/{n}"] = timed(open_deck, repeat)
+
+        SET_CACHE.invalidate(path)
+        cards = load_set(path).cards
+        report[f"cache_hit/{n}"] = timed(lambda: load_set(path), max(repeat, 100))
+
+        def draw_cards():
+            deck_session = DeckSession.start(len(cards))
+            for _ in range(min(100, n)):
+                deck_session.current()
+                deck_session.answer(True)
+
+        report[f"session/{n}"] = timed(draw_cards, repeat)
+
+        with client.session_transaction() as sess:
+            sess["quiz_set"] = name
+        report[f"start/{n}"] = timed(lambda: client.get("/start"), repeat)
+
+        # Answer the first questions of a fresh quiz, half right and half wrong
+        with client.session_transaction() as sess:
+            sess["quiz_set"] = name
+        client.get("/start")
+        answer_times = []
+        for i in range(min(requests, n)):
+            with client.session_transaction() as sess:
+                quiz_id = sess["quiz_id"]
+            deck_session = webapp.quiz_session(quiz_id, webapp.quiz_store.get(quiz_id))
+            correct = cards[deck_session.current()][1]
+            answer = correct if i % 2 == 0 else "wrong"
+            start = time.perf_counter()
+            client.post("/question", data={"answer": answer})
+            answer_times.append(time.perf_counter() - start)
+        report[f"answer/{n}"] = summarize(answer_times)
+
+        def record_round():
+            results_db.append(name, 1, n, n // 2, 50.0)
+            results_db.sessions(name)
+
+        report[f"results/{n}"] = timed(record_round, max(repeat, 20))
+
+        SET_CACHE.clear()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "sizes": sizes,
+            "repeat": repeat,
+            "requests": requests,
+        },
+        "results": report,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print median timings against the baseline. Returns True if none regressed."""
+    ok = True
+    print(f"{'benchmark':<22}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        now = result["median"]
+        if base is None:
+            print(f"{name:<22}{'-':>12}{now * 1000:>10.3f}ms{'new':>8}")
+            continue
+        ratio = now / base["median"] if base["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  SLOWER"
+            ok = False
+        print(f"{name:<22}{base['median'] * 1000:>10.3f}ms{now * 1000:>10.3f}ms{ratio:>7.2f}x{flag}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the flashcard app's hot paths.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated deck sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="answers posted per deck size")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed slowdown vs the baseline (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output) if args.output else None
+
+    current = run(sizes, args.repeat, args.requests)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if baseline is not None:
+        return 0 if compare(current, baseline, args.tolerance) else 1
+    if not output:
+        json.dump(current, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
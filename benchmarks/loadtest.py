@@ -0,0 +1,331 @@
+"""
+Load test: N virtual students taking a quiz at the same time.
+
+Each student is a thread with its own cookie jar that walks the real quiz
+flow:
+
+    GET  /select_quiz_set   POST /select_quiz_set   GET /start
+    GET  /question  ->  POST /question  (repeated; a share of the answers
+                                         is wrong, so repeat rounds happen)
+    GET  /result            (which may send them back for a practice round)
+
+Students read the question from the page and look up its answer in the
+synthetic deck the harness wrote, then answer wrong with probability
+--wrong-rate.
+
+The app is driven either in-process through Flask's test client (the
+default; runs against a temporary folder like bench.py) or over HTTP with
+--url, against a server started separately. In that case the deck is written
+into --sets-folder, which must be the folder the server serves.
+
+    python benchmarks/loadtest.py --students 1,10,50 --wrong-rate 0.3
+    SECRET_KEY=x python serve.py --workers 4 &
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --students 10,100,200
+
+For each level of --students it reports throughput, p50/p95/p99 latency per
+route, errors, and the size of the session cookies the app sets. Throughput
+that stops growing while latency climbs marks the saturation point.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from html import unescape
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bench import REPO_ROOT, git_commit, write_synthetic_deck
+
+QUESTION_RE = re.compile(r"<label>(.*?)</label>", re.S)
+PROGRESS_RE = re.compile(r"Question (\d+) of (\d+)")
+
+
+class Response(NamedTuple):
+    status: int
+    text: str
+    location: str
+    cookie_bytes: int    # size of the Set-Cookie headers in the response
+
+
+def route_path(location: str) -> str:
+    return urllib.parse.urlsplit(location).path or "/"
+
+
+# ---------- Clients ----------
+
+class InProcessClient:
+    """One student's browser on Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, str]] = None) -> Response:
+        resp = self.client.open(path, method=method, data=form)
+        cookies = resp.headers.getlist("Set-Cookie")
+        return Response(resp.status_code, resp.get_data(as_text=True),
+                        resp.headers.get("Location", ""), sum(len(c) for c in cookies))
+
+
+class HttpClient:
+    """One student's browser over a keep-alive HTTP connection."""
+
+    def __init__(self, url: str):
+        parts = urllib.parse.urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        self.cookies: Dict[str, str] = {}
+
+    def request(self, method: str, path: str, form: Optional[Dict[str, str]] = None) -> Response:
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection; retry once on a new one
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        text = resp.read().decode("utf-8", "replace")
+        cookie_bytes = 0
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            cookie_bytes += len(header)
+            name, _, rest = header.partition("=")
+            self.cookies[name.strip()] = rest.split(";", 1)[0]
+        return Response(resp.status, text, resp.headers.get("Location", ""), cookie_bytes)
+
+
+# ---------- Students ----------
+
+class Student:
+    def __init__(self, client, set_name: str, answers: Dict[str, str],
+                 wrong_rate: float, max_answers: int, seed: int):
+        self.client = client
+        self.set_name = set_name
+        self.answers = answers
+        self.wrong_rate = wrong_rate
+        self.max_answers = max_answers
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.cookie_sizes: List[int] = []
+        self.answered = 0
+        self.rounds = 0
+        self.finished = False
+
+    def call(self, method: str, path: str, form: Optional[Dict[str, str]] = None,
+             expect: Tuple[int, ...] = (200, 302)) -> Response:
+        route = f"{method} {path.split('?', 1)[0]}"
+        start = time.perf_counter()
+        resp = self.client.request(method, path, form)
+        self.latencies.setdefault(route, []).append(time.perf_counter() - start)
+        if resp.cookie_bytes:
+            self.cookie_sizes.append(resp.cookie_bytes)
+        if resp.status not in expect:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return resp
+
+    def run(self) -> None:
+        query = urllib.parse.urlencode({"q": self.set_name})
+        self.call("GET", f"/select_quiz_set?{query}")
+        self.call("POST", "/select_quiz_set", {"set_name": self.set_name})
+        resp = self.call("GET", "/start")
+        if route_path(resp.location) != "/question":
+            return
+        self.rounds = 1
+
+        page = "/question"
+        position = 0
+        while page in ("/question", "/result"):
+            if page == "/result":
+                resp = self.call("GET", "/result")
+                if resp.status == 302 and route_path(resp.location) == "/question":
+                    self.rounds += 1    # below 80%: another practice round
+                    page = "/question"
+                    position = 0
+                    continue
+                self.finished = resp.status == 200
+                return
+
+            if self.answered >= self.max_answers:
+                # Out of answers for this student: quit like a real one would
+                self.call("POST", "/question", {"action": "quit"})
+                return
+            resp = self.call("GET", "/question")
+            if resp.status == 302:
+                page = route_path(resp.location)
+                continue
+            match = QUESTION_RE.search(resp.text)
+            if resp.status != 200 or not match:
+                return
+            progress = PROGRESS_RE.search(resp.text)
+            if progress:
+                current = int(progress.group(1))
+                if current < position:
+                    self.rounds += 1    # missed questions are being repeated
+                position = current
+            question = unescape(match.group(1)).strip()
+            wrong = self.rng.random() < self.wrong_rate
+            answer = "not it" if wrong else self.answers.get(question, "")
+            resp = self.call("POST", "/question", {"answer": answer})
+            self.answered += 1
+            if resp.status != 302:
+                return
+            page = route_path(resp.location)
+
+
+# ---------- Running and reporting ----------
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    return {"count": len(ordered), "p50": at(0.50), "p95": at(0.95), "p99": at(0.99),
+            "max": ordered[-1]}
+
+
+def run_level(make_client, students: int, set_name: str, answers: Dict[str, str],
+              wrong_rate: float, max_answers: int) -> Dict[str, Any]:
+    """Run `students` students at once and summarize what they saw."""
+    crowd = [
+        Student(make_client(), set_name, answers, wrong_rate, max_answers, seed=i)
+        for i in range(students)
+    ]
+    barrier = threading.Barrier(students)
+
+    def walk(student: Student) -> None:
+        barrier.wait()
+        try:
+            student.run()
+        except Exception as e:  # count it and let the other students carry on
+            student.errors[type(e).__name__] = student.errors.get(type(e).__name__, 0) + 1
+
+    threads = [threading.Thread(target=walk, args=(s,)) for s in crowd]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    cookies: List[int] = []
+    for s in crowd:
+        for route, times in s.latencies.items():
+            latencies.setdefault(route, []).extend(times)
+        for route, count in s.errors.items():
+            errors[route] = errors.get(route, 0) + count
+        cookies.extend(s.cookie_sizes)
+
+    requests = sum(len(t) for t in latencies.values())
+    return {
+        "students": students,
+        "seconds": elapsed,
+        "requests": requests,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "answers_per_second": sum(s.answered for s in crowd) / elapsed if elapsed else 0.0,
+        "finished": sum(s.finished for s in crowd),
+        "rounds": sum(s.rounds for s in crowd),
+        "errors": errors,
+        "routes": {route: percentiles(times) for route, times in sorted(latencies.items())},
+        "session_cookie_bytes": percentiles(cookies) if cookies else None,
+    }
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"\n== {level['students']} students: {level['requests']} requests in "
+          f"{level['seconds']:.2f}s = {level['requests_per_second']:.1f} req/s, "
+          f"{level['answers_per_second']:.1f} answers/s; {level['finished']} finished, "
+          f"{level['rounds']} rounds")
+    print(f"{'route':<26}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for route, p in level["routes"].items():
+        print(f"{route:<26}{p['count']:>8}" + "".join(
+            f"{p[k] * 1000:>8.1f}ms" for k in ("p50", "p95", "p99", "max")))
+    cookies = level["session_cookie_bytes"]
+    if cookies:
+        print(f"session cookie: p50 {cookies['p50']} bytes, max {cookies['max']} bytes")
+    if level["errors"]:
+        print("errors: " + ", ".join(f"{k} x{v}" for k, v in level["errors"].items()))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate students taking quizzes at once.")
+    parser.add_argument("--students", default="1,10,50",
+                        help="comma-separated numbers of concurrent students, one run each")
+    parser.add_argument("--deck-size", type=int, default=30, help="cards in the quiz set")
+    parser.add_argument("--wrong-rate", type=float, default=0.2,
+                        help="chance that a student answers a question wrong")
+    parser.add_argument("--max-answers", type=int, default=200,
+                        help="answers per student before they quit")
+    parser.add_argument("--url", help="load a running server instead of the app in-process")
+    parser.add_argument("--sets-folder", default="flashcard_sets",
+                        help="with --url: the server's sets folder (the deck is written there)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+    levels = [int(n) for n in args.students.split(",")]
+
+    set_name = f"loadtest_{args.deck_size}"
+    if args.url:
+        folder = args.sets_folder
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        workdir = tempfile.mkdtemp(prefix="flashcard-loadtest-")
+        os.environ["QUIZ_DATA_DB"] = os.path.join(workdir, "loadtest.db")
+        os.environ["QUIZ_REPLAY_LOG"] = os.path.join(workdir, "quiz_replay.log")
+        os.environ.setdefault("QUIZ_STORE", "memory")
+        os.environ.setdefault("WATCH_SETS", "0")
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_ROOT)
+        import app as webapp
+        folder = webapp.SETS_FOLDER
+        make_client = lambda: InProcessClient(webapp.app)  # noqa: E731
+
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{set_name}.txt")
+    write_synthetic_deck(path, args.deck_size)
+    answers: Dict[str, str] = {}
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    for question, answer in zip(lines[::2], lines[1::2]):
+        answers[question] = answer
+
+    results = []
+    for students in levels:
+        level = run_level(make_client, students, set_name, answers,
+                          args.wrong_rate, args.max_answers)
+        print_level(level)
+        results.append(level)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "target": args.url or "in-process",
+                    "deck_size": args.deck_size,
+                    "wrong_rate": args.wrong_rate,
+                    "timestamp": time.time(),
+                },
+                "levels": results,
+            }, f, indent=2)
+    return 1 if any(level["errors"] for level in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
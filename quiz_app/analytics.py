@@ -0,0 +1,318 @@
+"""
+Running aggregates over quiz history.
+
+Every recorded round updates one summary row per quiz, and every answer one
+summary row per (quiz, card), in the same SQLite file as the raw results:
+
+    quiz_summary   rounds, questions, correct answers, sum / best / last /
+                   moving average of round scores, attempts, passes and the
+                   rounds it took to pass
+    card_summary   times seen and answered correctly, plus a difficulty
+                   score (smoothed miss rate) indexed per quiz
+
+So the dashboard and the summary command read a handful of rows however long
+the history is, instead of rescanning every round. Rounds are added by
+ResultsStore.append() in the same transaction as the raw row; answers are
+buffered like card_stats.py and written in batches.
+
+    python -m quiz_app.analytics            # every quiz
+    python -m quiz_app.analytics Biology    # one quiz and its hardest cards
+"""
+
+import argparse
+import atexit
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from .card_stats import FLUSH_EVERY, FLUSH_SECONDS
+    from .scheduler import DEFAULT_DB
+except ImportError:  # running as a script
+    from card_stats import FLUSH_EVERY, FLUSH_SECONDS
+    from scheduler import DEFAULT_DB
+
+# A round at or above this score passes the quiz (the 80% rule)
+PASS_PERCENT = 80.0
+
+# Weight of the newest round in the moving-average trend
+TREND_WEIGHT = 0.2
+
+BACKFILL_MARKER = "analytics:quiz_summary"
+
+
+class QuizSummary(NamedTuple):
+    quiz_name: str
+    rounds: int
+    questions: int
+    correct: int
+    percent_sum: float
+    best_percent: float
+    last_percent: float
+    trend: float
+    last_at: float
+    attempts: int
+    passes: int
+    pass_round_sum: int
+
+    @property
+    def average_percent(self) -> float:
+        return self.percent_sum / self.rounds if self.rounds else 0.0
+
+    @property
+    def rounds_to_pass(self) -> Optional[float]:
+        """Average round number at which attempts passed."""
+        return self.pass_round_sum / self.passes if self.passes else None
+
+
+SUMMARY_COLUMNS = ", ".join(QuizSummary._fields)
+
+
+class CardSummary(NamedTuple):
+    card_key: str
+    question: str
+    seen: int
+    correct: int
+    difficulty: float
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.correct / self.seen if self.seen else 0.0
+
+
+# ---------- Writing (called inside the results store's transaction) ----------
+
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS quiz_summary ("
+        " quiz_name TEXT PRIMARY KEY,"
+        " rounds INTEGER NOT NULL,"
+        " questions INTEGER NOT NULL,"
+        " correct INTEGER NOT NULL,"
+        " percent_sum REAL NOT NULL,"
+        " best_percent REAL NOT NULL,"
+        " last_percent REAL NOT NULL,"
+        " trend REAL NOT NULL,"
+        " last_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL,"
+        " passes INTEGER NOT NULL,"
+        " pass_round_sum INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS card_summary ("
+        " quiz_name TEXT NOT NULL,"
+        " card_key TEXT NOT NULL,"
+        " question TEXT NOT NULL,"
+        " seen INTEGER NOT NULL,"
+        " correct INTEGER NOT NULL,"
+        " difficulty REAL NOT NULL,"
+        " PRIMARY KEY (quiz_name, card_key))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS card_summary_difficulty"
+        " ON card_summary(quiz_name, difficulty DESC)"
+    )
+
+
+def add_round(conn: sqlite3.Connection, quiz_name: str, round_number: int,
+              total_questions: int, correct_answers: int, score_percent: float,
+              recorded_at: float, passed: Optional[bool] = None) -> None:
+    """
+    Fold one round into its quiz's summary. A round 1 starts an attempt;
+    passed (default: score >= PASS_PERCENT) marks the round that passed it.
+    """
+    if passed is None:
+        passed = score_percent >= PASS_PERCENT
+    conn.execute(
+        "INSERT INTO quiz_summary (quiz_name, rounds, questions, correct, percent_sum,"
+        " best_percent, last_percent, trend, last_at, attempts, passes, pass_round_sum)"
+        " VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        " ON CONFLICT (quiz_name) DO UPDATE SET"
+        "  rounds = rounds + 1,"
+        "  questions = questions + excluded.questions,"
+        "  correct = correct + excluded.correct,"
+        "  percent_sum = percent_sum + excluded.percent_sum,"
+        "  best_percent = MAX(best_percent, excluded.best_percent),"
+        "  last_percent = excluded.last_percent,"
+        f"  trend = trend * {1 - TREND_WEIGHT} + excluded.trend * {TREND_WEIGHT},"
+        "  last_at = MAX(last_at, excluded.last_at),"
+        "  attempts = attempts + excluded.attempts,"
+        "  passes = passes + excluded.passes,"
+        "  pass_round_sum = pass_round_sum + excluded.pass_round_sum",
+        (
+            quiz_name, total_questions, correct_answers, score_percent,
+            score_percent, score_percent, score_percent, recorded_at,
+            int(round_number == 1), int(passed), round_number if passed else 0,
+        ),
+    )
+
+
+def backfill(conn: sqlite3.Connection) -> int:
+    """
+    Build quiz_summary from rounds recorded before it existed (once per
+    database). Returns the number of rounds folded in.
+    """
+    if conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (BACKFILL_MARKER,)).fetchone():
+        return 0
+    count = 0
+    try:
+        with conn:
+            conn.execute("INSERT INTO store_meta (key, value) VALUES (?, ?)",
+                         (BACKFILL_MARKER, str(time.time())))
+            rows = conn.execute(
+                "SELECT quiz_name, round, total_questions, correct_answers, score_percent,"
+                " recorded_at FROM quiz_results ORDER BY id"
+            ).fetchall()
+            for row in rows:
+                add_round(conn, *row)
+                count += 1
+    except sqlite3.IntegrityError:
+        # Another process is backfilling the same database
+        return 0
+    return count
+
+
+# ---------- Per-card answers and reads ----------
+
+class Analytics:
+    """Reads of the summaries, and buffered per-card answer counts."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], List] = {}   # (quiz, key) -> [question, seen, correct]
+        self._pending_answers = 0
+        self._oldest = 0.0
+        conn = self._conn()
+        create_tables(conn)
+        conn.commit()
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record_answer(self, quiz_name: str, key: str, question: str, correct: bool) -> None:
+        """Count one answer to a card. Written on the next flush."""
+        now = time.time()
+        with self._lock:
+            counts = self._pending.get((quiz_name, key))
+            if counts is None:
+                counts = self._pending[(quiz_name, key)] = [question, 0, 0]
+            counts[1] += 1
+            counts[2] += int(correct)
+            if not self._pending_answers:
+                self._oldest = now
+            self._pending_answers += 1
+            due = self._pending_answers >= FLUSH_EVERY or now - self._oldest >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered answers in one transaction. Returns rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_answers = 0
+        if not pending:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO card_summary (quiz_name, card_key, question, seen, correct, difficulty)"
+                " VALUES (?, ?, ?, ?, ?, (? - ? + 1.0) / (? + 2.0))"
+                " ON CONFLICT (quiz_name, card_key) DO UPDATE SET"
+                "  question = excluded.question,"
+                "  seen = seen + excluded.seen,"
+                "  correct = correct + excluded.correct,"
+                # Misses smoothed towards 50%, so one wrong answer doesn't top the list
+                "  difficulty = (seen + excluded.seen - correct - excluded.correct + 1.0)"
+                "               / (seen + excluded.seen + 2.0)",
+                [
+                    (quiz, key, question, seen, correct, seen, correct, seen)
+                    for (quiz, key), (question, seen, correct) in pending.items()
+                ],
+            )
+        return len(pending)
+
+    def quiz(self, quiz_name: str) -> Optional[QuizSummary]:
+        row = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM quiz_summary WHERE quiz_name = ?", (quiz_name,)
+        ).fetchone()
+        return QuizSummary(*row) if row else None
+
+    def quizzes(self, limit: int = 50) -> List[QuizSummary]:
+        """Summaries of the most recently practiced quizzes."""
+        rows = self._conn().execute(
+            f"SELECT {SUMMARY_COLUMNS} FROM quiz_summary ORDER BY last_at DESC LIMIT ?", (limit,)
+        )
+        return [QuizSummary(*row) for row in rows]
+
+    def hardest(self, quiz_name: str, limit: int = 10) -> List[CardSummary]:
+        """The cards of a quiz that are missed most (read through the difficulty index)."""
+        self.flush()
+        rows = self._conn().execute(
+            "SELECT card_key, question, seen, correct, difficulty FROM card_summary"
+            " WHERE quiz_name = ? ORDER BY difficulty DESC LIMIT ?",
+            (quiz_name, limit),
+        )
+        return [CardSummary(*row) for row in rows]
+
+
+def format_summary(s: QuizSummary) -> List[str]:
+    lines = [
+        f"{s.quiz_name}: {s.rounds} round(s), {s.correct}/{s.questions} correct",
+        f"  average {s.average_percent:.1f}%, best {s.best_percent:.1f}%, "
+        f"last {s.last_percent:.1f}%, recent trend {s.trend:.1f}%",
+    ]
+    if s.rounds_to_pass is not None:
+        lines.append(f"  passed {s.passes} of {s.attempts} attempt(s), "
+                     f"after {s.rounds_to_pass:.1f} round(s) on average")
+    elif s.attempts:
+        lines.append(f"  not passed yet in {s.attempts} attempt(s)")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize quiz history.")
+    parser.add_argument("quiz", nargs="?", help="one quiz (shows its hardest cards too)")
+    parser.add_argument("--limit", type=int, default=10, help="quizzes or cards to show")
+    parser.add_argument("--db", default=DEFAULT_DB, help="results database")
+    args = parser.parse_args(argv)
+
+    try:
+        from .results_store import ResultsStore
+    except ImportError:
+        from results_store import ResultsStore
+    ResultsStore(args.db)  # creates and backfills the summaries on first use
+    analytics = Analytics(args.db)
+
+    if args.quiz:
+        summary = analytics.quiz(args.quiz)
+        if summary is None:
+            print(f"No rounds recorded for {args.quiz!r}.")
+            return 1
+        print("\n".join(format_summary(summary)))
+        hardest = analytics.hardest(args.quiz, args.limit)
+        if hardest:
+            print("\nHardest cards:")
+            for card in hardest:
+                print(f"  {card.percent:5.1f}% of {card.seen:>4}  {card.question}")
+        return 0
+
+    summaries = analytics.quizzes(args.limit)
+    if not summaries:
+        print("No rounds recorded yet.")
+    for summary in summaries:
+        print("\n".join(format_summary(summary)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Non-blocking, coalesced loading for asyncio servers.
+
+CoalescingLoader runs a blocking load function (reading and parsing a set)
+in a worker thread, so the event loop keeps serving other requests while
+the disk is busy. If many requests ask for the same key at once - a whole
+class starting the same quiz - only the first one starts a load and the
+rest wait for its result.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict
+
+
+class CoalescingLoader:
+    """One in-flight load per key, shared by every coroutine that asks for it."""
+
+    def __init__(self, load: Callable[[str], Any]):
+        self._load = load
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        self.loads = 0
+        self.coalesced = 0
+
+    async def get(self, key: str) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            self.loads += 1
+            future = asyncio.ensure_future(asyncio.to_thread(self._load, key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        # shield: a waiter that gives up (client disconnected) must not cancel
+        # the load the other waiters are still waiting for
+        return await asyncio.shield(future)
+
+    def _finished(self, key: str, future: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # mark as retrieved even if nobody is waiting
+
+    def stats(self) -> Dict[str, int]:
+        return {"loads": self.loads, "coalesced": self.coalesced, "inflight": len(self._inflight)}
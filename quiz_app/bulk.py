@@ -0,0 +1,330 @@
+"""
+Bulk import and export of cards.
+
+Import reads a stream once, record by record, in one of three formats:
+
+  jsonl  {"question": "...", "answer": "...", "set": "optional set name"}
+  csv    question,answer[,set]   (a header row naming the columns is optional)
+  txt    the upload format: "Question?" line, answer on the next line
+
+Cards go to the record's "set" (or the default set) and are written with
+journal.append_cards() in batches of BATCH_SIZE per set, so importing a
+50k-card bank costs a few dozen appends instead of 50k full-file rewrites.
+Bad records are skipped and reported.
+
+Export streams cards out in the same formats, chunk by chunk: text sets are
+read line by line and JSON sets come from the shared parsed-set cache, so
+no extra copy of a deck is built.
+
+    python -m quiz_app.bulk import bank.csv --set Biology
+    python -m quiz_app.bulk export --sets Biology,History --format jsonl -o out.jsonl
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from . import journal
+    from .catalog import SetCatalog
+    from .interprocess import ChangeFeed
+    from .parser import RejectedLine, iter_file_cards, iter_stream_cards
+    from .set_cache import SET_CACHE, load_set
+except ImportError:  # running as a script
+    import journal
+    from catalog import SetCatalog
+    from interprocess import ChangeFeed
+    from parser import RejectedLine, iter_file_cards, iter_stream_cards
+    from set_cache import SET_CACHE, load_set
+
+FORMATS = ("jsonl", "csv", "txt")
+
+# Cards written per journal append
+BATCH_SIZE = 1000
+
+# How many rejected records to keep for the report
+MAX_REPORTED = 100
+
+# Export output is yielded in pieces of about this many characters
+CHUNK_CHARS = 64 * 1024
+
+Record = Tuple[str, str, str, int]   # (set name, question, answer, line number)
+
+
+class BulkError(Exception):
+    """An import or export request that can't be carried out."""
+
+
+class ImportReport(NamedTuple):
+    sets: Dict[str, int]            # set name -> cards imported
+    rejected: List[RejectedLine]    # first MAX_REPORTED rejected records
+    rejected_total: int
+
+    @property
+    def cards(self) -> int:
+        return sum(self.sets.values())
+
+
+def guess_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext in FORMATS:
+        return ext
+    raise BulkError(f"Unknown import format for {filename!r}; use .jsonl, .csv or .txt")
+
+
+def safe_set_name(name: str) -> str:
+    """A set name that can be used as a file name inside the sets folder."""
+    name = name.strip()
+    if not name or name.startswith(".") or os.path.basename(name) != name:
+        raise BulkError(f"Invalid set name: {name!r}")
+    return name
+
+
+# ---------- Reading records ----------
+
+def iter_records(stream: BinaryIO, fmt: str, default_set: Optional[str],
+                 reject) -> Iterator[Record]:
+    """(set, question, answer, line) for every valid record in a binary stream."""
+    if fmt == "txt":
+        if not default_set:
+            raise BulkError("A set name is required to import a .txt file")
+        for card in iter_stream_cards(stream, reject):
+            if card.answer:
+                yield default_set, card.question, card.answer, card.line
+        return
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        if fmt == "jsonl":
+            yield from _jsonl_records(text, default_set, reject)
+        elif fmt == "csv":
+            yield from _csv_records(text, default_set, reject)
+        else:
+            raise BulkError(f"Unknown format: {fmt!r}")
+    finally:
+        text.detach()
+
+
+def _jsonl_records(text: Iterable[str], default_set: Optional[str], reject) -> Iterator[Record]:
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            reject(RejectedLine(line_no, 0, line[:80], "not valid JSON"))
+            continue
+        if not isinstance(item, dict):
+            reject(RejectedLine(line_no, 0, line[:80], "not a JSON object"))
+            continue
+        record = _make_record(item.get("set"), item.get("question"), item.get("answer"),
+                              default_set, line_no, line, reject)
+        if record:
+            yield record
+
+
+def _csv_records(text: Iterable[str], default_set: Optional[str], reject) -> Iterator[Record]:
+    columns = {"question": 0, "answer": 1, "set": 2}
+    for line_no, row in enumerate(csv.reader(text), start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if line_no == 1 and {c.strip().lower() for c in row} >= {"question", "answer"}:
+            columns = {c.strip().lower(): i for i, c in enumerate(row)}
+            continue
+
+        def cell(name: str) -> Optional[str]:
+            i = columns.get(name)
+            return row[i] if i is not None and i < len(row) else None
+
+        record = _make_record(cell("set"), cell("question"), cell("answer"),
+                              default_set, line_no, ",".join(row), reject)
+        if record:
+            yield record
+
+
+def _make_record(set_name, question, answer, default_set, line_no, raw, reject) -> Optional[Record]:
+    question = str(question or "").strip()
+    answer = str(answer or "").strip()
+    set_name = str(set_name or "").strip() or default_set
+    if not question or not answer:
+        reject(RejectedLine(line_no, 0, raw[:80], "missing question or answer"))
+        return None
+    if not set_name:
+        reject(RejectedLine(line_no, 0, raw[:80], "no set given and no default set"))
+        return None
+    try:
+        set_name = safe_set_name(set_name)
+    except BulkError as e:
+        reject(RejectedLine(line_no, 0, raw[:80], str(e)))
+        return None
+    return set_name, question, answer, line_no
+
+
+# ---------- Import ----------
+
+def import_stream(stream: BinaryIO, fmt: str, folder: str, default_set: Optional[str] = None,
+                  catalog: Optional[SetCatalog] = None, changes: Optional[ChangeFeed] = None,
+                  batch_size: int = BATCH_SIZE) -> ImportReport:
+    """
+    Import every record of a stream into JSON sets in folder, in one pass.
+    The catalog and change feed (created for folder if not given) are
+    updated once per touched set at the end.
+    """
+    if default_set:
+        default_set = safe_set_name(default_set)
+    rejected: List[RejectedLine] = []
+    rejected_total = 0
+
+    def reject(line: RejectedLine) -> None:
+        nonlocal rejected_total
+        rejected_total += 1
+        if len(rejected) < MAX_REPORTED:
+            rejected.append(line)
+
+    buffers: Dict[str, List[Tuple[str, str]]] = {}
+    counts: Dict[str, int] = {}
+
+    def set_path(name: str) -> str:
+        return os.path.join(folder, f"{name}.json")
+
+    def flush(name: str) -> None:
+        batch = buffers.pop(name, None)
+        if batch:
+            journal.append_cards(set_path(name), batch)
+
+    text_sets = set()
+    for name, question, answer, line_no in iter_records(stream, fmt, default_set, reject):
+        if name not in counts and name not in text_sets:
+            # Quizzes open name.txt before name.json, so cards imported
+            # next to a text set would never be asked
+            if os.path.exists(os.path.join(folder, f"{name}.txt")):
+                text_sets.add(name)
+            else:
+                counts[name] = 0
+        if name in text_sets:
+            reject(RejectedLine(line_no, 0, question[:80], f"{name!r} is a .txt set"))
+            continue
+        buffers.setdefault(name, []).append((question, answer))
+        counts[name] += 1
+        if len(buffers[name]) >= batch_size:
+            flush(name)
+    for name in list(buffers):
+        flush(name)
+
+    catalog = catalog or SetCatalog(folder)
+    changes = changes or ChangeFeed(os.path.join(folder, ".catalog", "changes.log"))
+    for name in counts:
+        path = set_path(name)
+        SET_CACHE.invalidate(path)
+        catalog.update(path)
+        changes.publish(path)
+    return ImportReport(counts, rejected, rejected_total)
+
+
+# ---------- Export ----------
+
+def iter_set_cards(path: str) -> Iterator[Tuple[str, str]]:
+    """Cards of one set without building a new copy of the deck."""
+    if path.endswith(".txt"):
+        for card in iter_file_cards(path):
+            yield card.question, card.answer
+    else:
+        yield from load_set(path).cards
+
+
+def export_chunks(sets: Iterable[Tuple[str, str]], fmt: str) -> Iterator[str]:
+    """
+    Yield the export of (set name, path) pairs as text chunks of about
+    CHUNK_CHARS. The txt format has no place for set names, so all sets
+    are written one after the other.
+    """
+    if fmt not in FORMATS:
+        raise BulkError(f"Unknown format: {fmt!r}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(["question", "answer", "set"])
+
+    for name, path in sets:
+        for question, answer in iter_set_cards(path):
+            if fmt == "jsonl":
+                buffer.write(json.dumps({"question": question, "answer": answer, "set": name}) + "\n")
+            elif fmt == "csv":
+                writer.writerow([question, answer, name])
+            else:
+                buffer.write(f"{question}\n{answer}\n\n")
+            if buffer.tell() >= CHUNK_CHARS:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def catalog_sets(catalog: SetCatalog, names: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """(set name, path) for the named sets, or every set in the catalog."""
+    entries = {e["name"]: os.path.join(catalog.folder, e["file"]) for e in catalog.entries()}
+    if names is None:
+        return sorted(entries.items(), key=lambda item: item[0].lower())
+    missing = [n for n in names if n not in entries]
+    if missing:
+        raise BulkError("Unknown set(s): " + ", ".join(missing))
+    return [(n, entries[n]) for n in names]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import/export of flashcard sets.")
+    parser.add_argument("--folder", default="flashcard_sets", help="sets folder")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imp = commands.add_parser("import", help="import cards from .jsonl, .csv or .txt")
+    imp.add_argument("file", help="file to import, or - for stdin")
+    imp.add_argument("--set", help="set for records that don't name one")
+    imp.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+
+    exp = commands.add_parser("export", help="export sets")
+    exp.add_argument("--sets", help="comma-separated set names (default: all)")
+    exp.add_argument("--format", choices=FORMATS, default="jsonl")
+    exp.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "import":
+            fmt = args.format or guess_format(args.file)
+            if args.file == "-":
+                report = import_stream(sys.stdin.buffer, fmt, args.folder, args.set)
+            else:
+                with open(args.file, "rb") as f:
+                    report = import_stream(f, fmt, args.folder, args.set)
+            for name, count in sorted(report.sets.items()):
+                print(f"{name}: imported {count} cards")
+            if report.rejected_total:
+                print(f"{report.rejected_total} record(s) skipped:")
+                for line in report.rejected[:10]:
+                    print(f"  line {line.line}: {line.reason} ({line.text})")
+        else:
+            names = [n.strip() for n in args.sets.split(",")] if args.sets else None
+            sets = catalog_sets(SetCatalog(args.folder), names)
+            out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+            try:
+                for chunk in export_chunks(sets, args.format):
+                    out.write(chunk)
+            finally:
+                if args.output:
+                    out.close()
+    except BulkError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
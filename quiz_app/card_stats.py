@@ -0,0 +1,162 @@
+"""
+Persistent per-user, per-card answer statistics.
+
+Counts how often each user has seen each card and how often they got it
+right, keyed by card_key() (a hash of question + answer), so the numbers
+follow a card even if it is copied into another set.
+
+Answers are buffered in memory and written in one batched upsert when the
+buffer fills up, when FLUSH_SECONDS have passed, or when the process exits,
+so recording an answer normally doesn't touch the disk at all. Buffered
+counts are increments, which makes it safe for several processes to flush
+into the same database.
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    from .scheduler import DEFAULT_DB, FLUSH_EVERY, FLUSH_SECONDS
+except ImportError:  # running as a script
+    from scheduler import DEFAULT_DB, FLUSH_EVERY, FLUSH_SECONDS
+
+
+class CardStats:
+    __slots__ = ("times_seen", "times_correct", "last_seen")
+
+    def __init__(self, times_seen: int = 0, times_correct: int = 0, last_seen: float = 0.0):
+        self.times_seen = times_seen
+        self.times_correct = times_correct
+        self.last_seen = last_seen
+
+    @property
+    def mistakes(self) -> int:
+        return max(0, self.times_seen - self.times_correct)
+
+
+class CardStatsStore:
+    """SQLite-backed card statistics with a write buffer."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], CardStats] = {}
+        self._pending_answers = 0
+        self._oldest = 0.0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS card_stats ("
+            " user TEXT NOT NULL,"
+            " card_key TEXT NOT NULL,"
+            " times_seen INTEGER NOT NULL DEFAULT 0,"
+            " times_correct INTEGER NOT NULL DEFAULT 0,"
+            " last_seen REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (user, card_key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS card_stats_key ON card_stats(card_key)")
+        conn.commit()
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, user: str, key: str, correct: bool) -> None:
+        """Count one answer. Written to disk on the next flush."""
+        now = time.time()
+        with self._lock:
+            stats = self._pending.get((user, key))
+            if stats is None:
+                stats = self._pending[(user, key)] = CardStats()
+            stats.times_seen += 1
+            stats.times_correct += int(correct)
+            stats.last_seen = now
+            if not self._pending_answers:
+                self._oldest = now
+            self._pending_answers += 1
+            due = (
+                self._pending_answers >= FLUSH_EVERY
+                or now - self._oldest >= FLUSH_SECONDS
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered answers in one transaction. Returns rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_answers = 0
+        if not pending:
+            return 0
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO card_stats (user, card_key, times_seen, times_correct, last_seen)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (user, card_key) DO UPDATE SET"
+            "  times_seen = times_seen + excluded.times_seen,"
+            "  times_correct = times_correct + excluded.times_correct,"
+            "  last_seen = MAX(last_seen, excluded.last_seen)",
+            [
+                (user, key, s.times_seen, s.times_correct, s.last_seen)
+                for (user, key), s in pending.items()
+            ],
+        )
+        conn.commit()
+        return len(pending)
+
+    def load(self, user: str, keys: Iterable[str]) -> Dict[str, CardStats]:
+        """Stats for one user's cards, including answers not flushed yet."""
+        keys = list(keys)
+        result: Dict[str, CardStats] = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT card_key, times_seen, times_correct, last_seen FROM card_stats"
+                f" WHERE user = ? AND card_key IN ({marks})",
+                [user] + chunk,
+            )
+            for key, seen, correct, last in rows:
+                result[key] = CardStats(seen, correct, last)
+
+        with self._lock:
+            for key in keys:
+                extra = self._pending.get((user, key))
+                if extra is None:
+                    continue
+                stats = result.setdefault(key, CardStats())
+                stats.times_seen += extra.times_seen
+                stats.times_correct += extra.times_correct
+                stats.last_seen = max(stats.last_seen, extra.last_seen)
+        return result
+
+    def hardest(self, keys: Iterable[str], limit: int = 10) -> List[Tuple[str, int, int]]:
+        """
+        Cards with the lowest success rate across all users, as
+        (card_key, times_seen, times_correct). Used for instructor reports.
+        """
+        self.flush()
+        keys = list(keys)
+        totals: Dict[str, List[int]] = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                "SELECT card_key, SUM(times_seen), SUM(times_correct) FROM card_stats"
+                f" WHERE card_key IN ({marks}) GROUP BY card_key",
+                chunk,
+            )
+            for key, seen, correct in rows:
+                totals[key] = [seen, correct]
+        ranked = sorted(totals.items(), key=lambda kv: (kv[1][1] / kv[1][0], -kv[1][0]))
+        return [(key, seen, correct) for key, (seen, correct) in ranked[:limit]]
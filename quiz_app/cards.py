@@ -0,0 +1,155 @@
+"""
+Compact card storage shared by the web app and the console app.
+
+PackedCards   a parsed set as (question, answer) pairs without one Python
+              object per card: all questions are one UTF-8 blob plus an
+              offset array, and each distinct answer is stored once
+              ("True", "1919", ...) with a small id per card.
+DeckView      Flashcard objects over any sequence of pairs (PackedCards, a
+              memory-mapped .deck file, a tuple), created only when a card
+              is accessed and then kept, so per-card counters stick.
+Flashcard     a slotted card: question, answer and this session's counters.
+
+A 10^6-card deck held as tuples of str costs roughly 150-200 MB; packed it
+is about the size of its text plus 12 bytes per card.
+"""
+
+import sys
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+Pair = Tuple[str, str]
+
+
+class Flashcard:
+    __slots__ = ("question", "answer", "times_seen", "times_correct")
+
+    def __init__(self, question: str, answer: str, times_seen: int = 0, times_correct: int = 0):
+        self.question = question
+        self.answer = answer
+        self.times_seen = times_seen
+        self.times_correct = times_correct
+
+    @property
+    def mistakes(self) -> int:
+        """How many times this card has been missed overall."""
+        return max(0, self.times_seen - self.times_correct)
+
+    def __repr__(self) -> str:
+        return (
+            f"Flashcard(question={self.question!r}, answer={self.answer!r}, "
+            f"times_seen={self.times_seen}, times_correct={self.times_correct})"
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Flashcard):
+            return NotImplemented
+        return (self.question, self.answer, self.times_seen, self.times_correct) == (
+            other.question, other.answer, other.times_seen, other.times_correct
+        )
+
+
+class PackedCards(Sequence[Pair]):
+    """Immutable (question, answer) pairs in a few flat buffers."""
+
+    __slots__ = ("_questions", "_offsets", "_answers", "_answer_ids")
+
+    def __init__(self, questions: bytes, offsets: array, answers: List[str], answer_ids: array):
+        self._questions = questions
+        self._offsets = offsets          # len(cards) + 1 byte offsets into _questions
+        self._answers = answers          # distinct answers
+        self._answer_ids = answer_ids    # index into _answers per card
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Pair]) -> "PackedCards":
+        chunks: List[bytes] = []
+        offsets = array("Q", [0])
+        answer_index: Dict[str, int] = {}
+        answers: List[str] = []
+        answer_ids = array("I")
+        position = 0
+        for question, answer in pairs:
+            encoded = question.encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+            answer_id = answer_index.get(answer)
+            if answer_id is None:
+                answer_id = answer_index[answer] = len(answers)
+                answers.append(sys.intern(answer))
+            answer_ids.append(answer_id)
+        return cls(b"".join(chunks), offsets, answers, answer_ids)
+
+    def __len__(self) -> int:
+        return len(self._answer_ids)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("card index out of range")
+        question = self._questions[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+        return question, self._answers[self._answer_ids[index]]
+
+    def __iter__(self) -> Iterator[Pair]:
+        blob, offsets, answers = self._questions, self._offsets, self._answers
+        for i, answer_id in enumerate(self._answer_ids):
+            yield blob[offsets[i]:offsets[i + 1]].decode("utf-8"), answers[answer_id]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this deck."""
+        return (
+            sys.getsizeof(self._questions)
+            + self._offsets.itemsize * len(self._offsets)
+            + self._answer_ids.itemsize * len(self._answer_ids)
+            + sum(sys.getsizeof(a) for a in self._answers)
+            + sys.getsizeof(self._answers)
+        )
+
+
+class DeckView(Sequence[Flashcard]):
+    """
+    Flashcards over a sequence of (question, answer) pairs, created on first
+    access. prepare(index, card), if set, fills in a card when it is created.
+    """
+
+    def __init__(self, pairs: Sequence[Pair],
+                 prepare: Optional[Callable[[int, Flashcard], None]] = None):
+        self.pairs = pairs
+        self._prepare = prepare
+        self._cards: Dict[int, Flashcard] = {}
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[Flashcard]) -> "DeckView":
+        """A view over cards that already exist (e.g. typed in by hand)."""
+        cards = list(cards)
+        view = cls(PackedCards.from_pairs((c.question, c.answer) for c in cards))
+        view._cards = dict(enumerate(cards))
+        return view
+
+    def set_prepare(self, prepare: Callable[[int, Flashcard], None]) -> None:
+        """Use prepare for new cards and apply it to the cards created so far."""
+        self._prepare = prepare
+        for index, card in self._cards.items():
+            prepare(index, card)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __getitem__(self, index: int) -> Flashcard:
+        if index < 0:
+            index += len(self.pairs)
+        card = self._cards.get(index)
+        if card is None:
+            question, answer = self.pairs[index]
+            card = self._cards[index] = Flashcard(question, answer)
+            if self._prepare is not None:
+                self._prepare(index, card)
+        return card
+
+    @property
+    def materialized(self) -> int:
+        """How many Flashcard objects exist so far."""
+        return len(self._cards)
@@ -0,0 +1,281 @@
+"""
+Persistent catalog of the question sets in a folder.
+
+Instead of calling os.listdir() and filtering by extension on every request,
+routes ask the catalog. For each set file it remembers:
+
+    name, format, card count, size, mtime and a content hash
+
+The catalog is saved as a small JSON file in a hidden folder inside the sets
+folder (.catalog/index.json) so it survives restarts and is shared by every
+process serving that folder. Keeping it in a subfolder means saving it does
+not change the sets folder's own mtime.
+
+- Writes made by the app (upload, add question) update one entry at a time
+  through update().
+- Out-of-band changes (files copied in by hand) are picked up by refresh(),
+  which only rescans the folder when the directory's mtime has changed.
+- Changes go through a lock file (.catalog/index.lock) and start by
+  reloading the saved index, so several worker processes never overwrite
+  each other's entries. Reads only take an in-process lock.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .interprocess import FileLock
+    from .set_cache import load_set
+except ImportError:  # running as a script
+    from interprocess import FileLock
+    from set_cache import load_set
+
+SET_EXTENSIONS = (".txt", ".json")
+CATALOG_DIR = ".catalog"
+
+
+def is_set_file(filename: str) -> bool:
+    """True for visible .txt / .json files (hidden files are app metadata)."""
+    return not filename.startswith(".") and filename.endswith(SET_EXTENSIONS)
+
+
+def content_hash(path: str) -> str:
+    """sha1 of a file's bytes, read in chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SetCatalog:
+    """Index of the set files in one folder, persisted to <folder>/.catalog/."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.index_dir = os.path.join(folder, CATALOG_DIR)
+        self.index_path = os.path.join(self.index_dir, "index.json")
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        # Taken before self._lock by anything that changes the index
+        self._write_lock = FileLock(os.path.join(self.index_dir, "index.lock"))
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dir_mtime_ns = 0
+        self._index_signature: Optional[Tuple[int, int]] = None
+        self.version = 0
+        # Sorted (lowercase name, name) pairs used for prefix search
+        self._sorted: List[Tuple[str, str]] = []
+        self._sorted_version = -1
+
+    # ---------- Public API ----------
+
+    def refresh(self) -> None:
+        """
+        Bring the catalog up to date. Cheap when nothing changed: one stat
+        of the index file and one stat of the folder.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            if os.stat(self.folder).st_mtime_ns == self._dir_mtime_ns:
+                return
+        with self._write_lock, self._lock:
+            # Another process may have rescanned while we waited for the lock
+            self._reload_if_changed()
+            dir_mtime = os.stat(self.folder).st_mtime_ns
+            if dir_mtime != self._dir_mtime_ns:
+                self._rescan(dir_mtime)
+
+    def version_key(self) -> str:
+        """
+        Identifies what the catalog holds, after a refresh(). Unlike
+        self.version it is the same in every process: it is the signature
+        of the saved index, which is rewritten on every change.
+        """
+        self.refresh()
+        with self._lock:
+            mtime_ns, size = self._index_signature or (0, 0)
+        return f"{mtime_ns:x}-{size:x}"
+
+    def modified_at(self) -> float:
+        """When the catalog last changed (the saved index's mtime)."""
+        with self._lock:
+            mtime_ns, _ = self._index_signature or (0, 0)
+        return mtime_ns / 1e9
+
+    def update(self, path: str) -> None:
+        """Re-index one set file right after the app wrote (or removed) it."""
+        filename = os.path.basename(path)
+        if not is_set_file(filename):
+            return
+        with self._write_lock, self._lock:
+            self._reload_if_changed()
+            if os.path.exists(path):
+                self._entries[filename] = self._index_file(filename)
+            else:
+                self._entries.pop(filename, None)
+            self._dir_mtime_ns = os.stat(self.folder).st_mtime_ns
+            self._changed()
+
+    def add_cards(self, path: str, count: int, seq: Optional[int] = None) -> None:
+        """
+        Record cards appended to a set's journal without re-reading the set.
+        The set file itself is unchanged, so its size/mtime/hash stay valid.
+
+        seq is the journal sequence number of the last card added. If the
+        entry was already re-indexed up to that point (by another process's
+        rescan), the cards are counted already and nothing changes.
+        """
+        filename = os.path.basename(path)
+        with self._write_lock, self._lock:
+            self._reload_if_changed()
+            entry = self._entries.get(filename)
+            if entry is None:
+                self.update(path)
+                return
+            if seq is not None:
+                if seq <= entry.get("journal_seq", 0):
+                    return
+                entry["journal_seq"] = seq
+            entry["cards"] += count
+            self._changed()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All catalog entries, sorted by file name."""
+        self.refresh()
+        with self._lock:
+            return [dict(self._entries[f]) for f in sorted(self._entries)]
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(filename)
+            return dict(entry) if entry else None
+
+    def list_sets(
+        self,
+        prefix: str = "",
+        offset: int = 0,
+        limit: Optional[int] = None,
+        fmt: Optional[str] = None,
+    ) -> Tuple[List[str], int]:
+        """
+        Set names (without extension) matching a case-insensitive prefix.
+
+        Returns (names for the requested page, total number of matches).
+        Pass fmt="json" or fmt="txt" to list only one format.
+        """
+        self.refresh()
+        with self._lock:
+            pairs = self._sorted_names(fmt)
+            key = prefix.lower()
+            start = bisect.bisect_left(pairs, (key, ""))
+            end = bisect.bisect_left(pairs, (key + "\uffff", "")) if key else len(pairs)
+            total = end - start
+            first = start + max(0, offset)
+            last = end if limit is None else min(end, first + limit)
+            return [name for _, name in pairs[first:last]], total
+
+    # ---------- Internals ----------
+
+    def _sorted_names(self, fmt: Optional[str]) -> List[Tuple[str, str]]:
+        if fmt is not None:
+            names = {
+                e["name"] for e in self._entries.values() if e["format"] == fmt
+            }
+            return sorted((n.lower(), n) for n in names)
+        if self._sorted_version != self.version:
+            names = {e["name"] for e in self._entries.values()}
+            self._sorted = sorted((n.lower(), n) for n in names)
+            self._sorted_version = self.version
+        return self._sorted
+
+    def _index_file(self, filename: str) -> Dict[str, Any]:
+        path = os.path.join(self.folder, filename)
+        st = os.stat(path)
+        name, ext = os.path.splitext(filename)
+        entry: Dict[str, Any] = {
+            "name": name,
+            "file": filename,
+            "format": ext[1:],
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": content_hash(path),
+            "cards": 0,
+        }
+        try:
+            parsed = load_set(path)
+            entry["cards"] = len(parsed)
+            if "journal_seq" in parsed.meta:
+                entry["journal_seq"] = parsed.meta["journal_seq"]
+        except (ValueError, OSError) as e:
+            # Keep malformed sets listed so they can be fixed, but note why
+            entry["error"] = str(e)
+        return entry
+
+    def _rescan(self, dir_mtime: int) -> None:
+        seen = set()
+        for filename in os.listdir(self.folder):
+            if not is_set_file(filename):
+                continue
+            seen.add(filename)
+            old = self._entries.get(filename)
+            try:
+                st = os.stat(os.path.join(self.folder, filename))
+            except FileNotFoundError:
+                continue
+            if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+                continue
+            self._entries[filename] = self._index_file(filename)
+
+        for filename in list(self._entries):
+            if filename not in seen:
+                del self._entries[filename]
+
+        self._dir_mtime_ns = dir_mtime
+        self._changed()
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._save()
+
+    def _reload_if_changed(self) -> None:
+        """Pick up a catalog saved by another process."""
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature == self._index_signature:
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # Corrupt or half-written index: rebuild it from the folder
+            self._entries = {}
+            self._dir_mtime_ns = 0
+            self._index_signature = signature
+            return
+        self._entries = data.get("entries", {})
+        self._dir_mtime_ns = data.get("dir_mtime_ns", 0)
+        self.version = max(self.version + 1, data.get("version", 0))
+        self._index_signature = signature
+
+    def _save(self) -> None:
+        data = {
+            "version": self.version,
+            "dir_mtime_ns": self._dir_mtime_ns,
+            "entries": self._entries,
+        }
+        # Write to a temp file and rename so readers never see a partial index
+        fd, tmp = tempfile.mkstemp(dir=self.index_dir, prefix="index.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.index_path)
+        st = os.stat(self.index_path)
+        self._index_signature = (st.st_mtime_ns, st.st_size)
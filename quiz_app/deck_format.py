@@ -0,0 +1,171 @@
+"""
+Compact binary deck format, read through mmap.
+
+Layout (all integers little-endian):
+
+    header   magic "FCDECK1\\0" (8 bytes)
+             format version      uint32
+             signature length    uint32   (how many signature values are used)
+             card count          uint64
+             source signature    4 x int64 (mtime/size of the source set and
+                                            of its journal, zero padded)
+    offsets  (2 * count + 1) x uint64   byte offsets into the blob
+    blob     question 0, answer 0, question 1, answer 1, ... as UTF-8
+
+Card i's question is blob[off[2i]:off[2i+1]] and its answer is
+blob[off[2i+1]:off[2i+2]], so DeckFile can return any card in O(1) without
+reading the rest of the deck into memory.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Iterable, Iterator, Sequence, Tuple
+
+MAGIC = b"FCDECK1\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ4q")
+OFFSET = struct.Struct("<3Q")
+
+Card = Tuple[str, str]
+
+
+class DeckFormatError(ValueError):
+    pass
+
+
+class DeckFile(Sequence[Card]):
+    """Read-only, memory-mapped view of a .deck file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise DeckFormatError(f"Truncated deck file: {path}")
+
+        magic, version, sig_len, count, *signature = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise DeckFormatError(f"Not a deck file: {path}")
+
+        self._count = count
+        self.signature = tuple(signature[:sig_len])
+        self._table = HEADER.size
+        self._blob = self._table + 8 * (2 * count + 1)
+        if len(self._mm) < self._blob:
+            raise DeckFormatError(f"Truncated deck file: {path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("deck index out of range")
+        q_start, a_start, end = OFFSET.unpack_from(self._mm, self._table + 16 * i)
+        base = self._blob
+        return (
+            self._mm[base + q_start:base + a_start].decode("utf-8"),
+            self._mm[base + a_start:base + end].decode("utf-8"),
+        )
+
+    def __iter__(self) -> Iterator[Card]:
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class DeckWriter:
+    """
+    Builds a deck one card at a time, so cards can be written as they are
+    parsed: the text is streamed into a temporary blob in folder and only the
+    offset table is kept in memory. finish() writes the deck file.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._offsets = array("Q", [0])
+        self._blob = tempfile.TemporaryFile(dir=folder)
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return (len(self._offsets) - 1) // 2
+
+    def add(self, question: str, answer: str) -> None:
+        for text in (question, answer):
+            data = text.encode("utf-8")
+            self._blob.write(data)
+            self._pos += len(data)
+            self._offsets.append(self._pos)
+
+    def finish(self, path: str, signature: Tuple[int, ...] = ()) -> int:
+        """Write the deck to path (atomically). Returns the number of cards."""
+        if len(signature) > 4:
+            raise ValueError("signature can hold at most 4 values")
+        count = len(self)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                   prefix=".tmp.", suffix=".deck")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                padded = tuple(signature) + (0,) * (4 - len(signature))
+                out.write(HEADER.pack(MAGIC, VERSION, len(signature), count, *padded))
+                offsets = array("Q", self._offsets)
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                offsets.tofile(out)
+                self._blob.seek(0)
+                for chunk in iter(lambda: self._blob.read(1024 * 1024), b""):
+                    out.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        finally:
+            self.close()
+        return count
+
+    def close(self) -> None:
+        self._blob.close()
+
+    def __enter__(self) -> "DeckWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_deck(path: str, cards: Iterable[Card], signature: Tuple[int, ...] = ()) -> int:
+    """
+    Write cards to path in deck format (atomically). Cards are streamed into
+    a temporary blob, so only the offset table is kept in memory.
+    Returns the number of cards written.
+    """
+    with DeckWriter(os.path.dirname(os.path.abspath(path))) as writer:
+        for question, answer in cards:
+            writer.add(question, answer)
+        return writer.finish(path, signature)
+
+
+def read_deck(path: str) -> DeckFile:
+    return DeckFile(path)
+
+
+if __name__ == "__main__":
+    # python -m quiz_app.deck_format SET_FILE...  -> write .deck copies now
+    try:
+        from .set_cache import convert_to_deck
+    except ImportError:
+        from set_cache import convert_to_deck
+
+    for set_file in sys.argv[1:]:
+        out, count = convert_to_deck(set_file)
+        print(f"{set_file}: {count} cards -> {out}")
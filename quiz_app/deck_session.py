@@ -0,0 +1,236 @@
+"""
+A quiz over a deck, as a seeded permutation of card indices.
+
+A round never copies or shuffles the deck. Its order is:
+
+  1. `first`  cards given explicitly (practiced cards that are due)
+  2. every other card of the round, in the order of Permutation(seed)
+  3. `last`   cards given explicitly (practiced cards not due yet)
+
+Permutation maps position -> card index one at a time, so starting a quiz
+costs O(practiced cards) and drawing the next card O(1). Missed cards are
+collected as an index list; the next round permutes just those, so
+restarting costs O(misses), not O(deck).
+
+The whole session is a small JSON-able dict (state()) that grows only with
+the misses; the first round's `first`/`last` split never changes, so it is
+saved once on its own (split()). Each round's order follows from the seed
+and that split alone, so a student's quiz can be replayed:
+
+    python -m quiz_app.deck_session --size 500 --seed 1234567
+"""
+
+import argparse
+import hashlib
+import random
+import struct
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+FEISTEL_ROUNDS = 4
+
+
+def new_seed() -> int:
+    return random.SystemRandom().getrandbits(63)
+
+
+class Permutation:
+    """A seeded bijection on range(size), evaluated one position at a time."""
+
+    __slots__ = ("size", "seed", "_half", "_mask", "_keys")
+
+    def __init__(self, size: int, seed: int):
+        self.size = size
+        self.seed = seed
+        # Feistel network over the smallest even number of bits covering size;
+        # positions that land outside range(size) are encrypted again
+        # ("cycle walking"), which keeps it a bijection on range(size)
+        bits = max(2, (size - 1).bit_length())
+        bits += bits & 1
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        self._keys = [struct.pack("<QB", seed & (2 ** 64 - 1), r) for r in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, x: int) -> int:
+        half, mask = self._half, self._mask
+        left, right = x >> half, x & mask
+        for key in self._keys:
+            digest = hashlib.blake2b(right.to_bytes(8, "little"), digest_size=8, key=key).digest()
+            left, right = right, left ^ (int.from_bytes(digest, "little") & mask)
+        return (left << half) | right
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, position: int) -> int:
+        if not 0 <= position < self.size:
+            raise IndexError("position out of range")
+        x = self._encrypt(position)
+        while x >= self.size:
+            x = self._encrypt(x)
+        return x
+
+    def __iter__(self) -> Iterator[int]:
+        return (self[i] for i in range(self.size))
+
+
+def round_seed(seed: int, round_number: int) -> int:
+    """Seed of one round, derived from the session seed."""
+    digest = hashlib.blake2b(struct.pack("<QQ", seed & (2 ** 64 - 1), round_number), digest_size=8)
+    return int.from_bytes(digest.digest(), "little")
+
+
+class DeckSession:
+    """
+    Where a student is in a quiz. Cards are card indices; `base` is None in
+    the first round (the whole deck, `size` cards) and the previous round's
+    misses after that.
+    """
+
+    def __init__(self, seed: int, size: int, base: Optional[List[int]] = None,
+                 first: Sequence[int] = (), last: Sequence[int] = (), round_number: int = 1,
+                 position: int = 0, cursor: int = 0, misses: Optional[List[int]] = None):
+        self.seed = seed
+        self.size = size
+        self.base = base
+        self.first = list(first)
+        self.last = list(last)
+        self.round = round_number
+        self.position = position   # cards answered this round
+        self.cursor = cursor       # next permutation position to look at
+        self.misses = misses if misses is not None else []
+        self._perm = Permutation(len(base) if base is not None else size,
+                                 round_seed(seed, round_number))
+        self._skip: Optional[Set[int]] = None
+
+    @classmethod
+    def start(cls, size: int, seed: Optional[int] = None,
+              first: Sequence[int] = (), last: Sequence[int] = ()) -> "DeckSession":
+        """First round over range(size). first/last must be distinct card indices."""
+        return cls(new_seed() if seed is None else seed, size, first=first, last=last)
+
+    # ---------- Saving ----------
+
+    def state(self) -> Dict[str, Any]:
+        """What changes as cards are answered (first/last are in split())."""
+        return {
+            "seed": self.seed,
+            "size": self.size,
+            "base": self.base,
+            "round": self.round,
+            "position": self.position,
+            "cursor": self.cursor,
+            "misses": self.misses,
+        }
+
+    def split(self) -> Dict[str, List[int]]:
+        """The cards asked first and last this round; fixed once the round starts."""
+        return {"first": self.first, "last": self.last}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any],
+                   split: Optional[Dict[str, List[int]]] = None) -> "DeckSession":
+        # States saved before the split was kept apart still carry it themselves
+        split = split or state
+        return cls(state["seed"], state["size"], state["base"],
+                   split.get("first", ()), split.get("last", ()),
+                   state["round"], state["position"], state["cursor"], state["misses"])
+
+    # ---------- Drawing cards ----------
+
+    @property
+    def total(self) -> int:
+        """Cards in this round."""
+        return len(self.base) if self.base is not None else self.size
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= self.total
+
+    def _skipped(self) -> Set[int]:
+        if self._skip is None:
+            self._skip = set(self.first) | set(self.last)
+        return self._skip
+
+    def _scan(self) -> int:
+        """Permutation position of the next card in the middle part."""
+        cursor = self.cursor
+        if self.first or self.last:
+            skip = self._skipped()
+            while self._card_at(cursor) in skip:
+                cursor += 1
+        return cursor
+
+    def _card_at(self, cursor: int) -> int:
+        index = self._perm[cursor]
+        return self.base[index] if self.base is not None else index
+
+    def current(self) -> Optional[int]:
+        """Index of the card to ask now, or None when the round is over."""
+        if self.finished:
+            return None
+        if self.position < len(self.first):
+            return self.first[self.position]
+        if self.position >= self.total - len(self.last):
+            return self.last[self.position - (self.total - len(self.last))]
+        return self._card_at(self._scan())
+
+    def answer(self, correct: bool) -> None:
+        """Record an answer to current() and move on to the next card."""
+        if self.finished:
+            return
+        if len(self.first) <= self.position < self.total - len(self.last):
+            cursor = self._scan()
+            index = self._card_at(cursor)
+            self.cursor = cursor + 1
+        else:
+            index = self.current()
+        if not correct:
+            self.misses.append(index)
+        self.position += 1
+
+    def next_round(self) -> bool:
+        """Start a round over this round's misses. False if there were none."""
+        if not self.misses:
+            return False
+        self.base, self.misses = self.misses, []
+        self.first, self.last = [], []
+        self.round += 1
+        self.position = self.cursor = 0
+        self._perm = Permutation(len(self.base), round_seed(self.seed, self.round))
+        self._skip = None
+        return True
+
+    def order(self) -> List[int]:
+        """Every card of this round in order (for replaying a quiz)."""
+        replay = DeckSession(self.seed, self.size, self.base, self.first, self.last, self.round)
+        cards = []
+        while not replay.finished:
+            cards.append(replay.current())
+            replay.answer(True)
+        return cards
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Print the card order of a quiz round.")
+    parser.add_argument("--size", type=int, required=True, help="cards in the deck")
+    parser.add_argument("--seed", type=int, required=True, help="seed saved with the quiz")
+    parser.add_argument("--round", type=int, default=1,
+                        help="round number (later rounds need --misses)")
+    parser.add_argument("--misses", help="comma-separated card indices missed in the round before")
+    parser.add_argument("--first", help="comma-separated card indices asked first")
+    parser.add_argument("--last", help="comma-separated card indices asked last")
+    args = parser.parse_args(argv)
+
+    def indices(text: Optional[str]) -> List[int]:
+        return [int(i) for i in text.split(",")] if text else []
+
+    base = indices(args.misses) if args.round > 1 else None
+    session = DeckSession(args.seed, args.size, base, indices(args.first), indices(args.last),
+                          round_number=args.round)
+    print(" ".join(map(str, session.order())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Duplicate and near-duplicate detection for question cards.
+
+Two cards are duplicates when their answers match after normalization and
+their questions are either identical after normalization, or similar enough
+that the estimated Jaccard similarity of their character shingles is at
+least THRESHOLD ("When was Babson College founded?" vs "When was Babson
+founded? ").
+
+Exact duplicates are found with a hash set. Near-duplicates use MinHash
+signatures with LSH banding: a card is only compared with the few cards
+that share a band bucket with it, so checking a new card does not scan the
+whole log.
+
+Used when appending to the manual question log, and offline as a
+compaction command:
+
+    python -m quiz_app.dedup quiz_app/manual_questions_log.txt manual_questions.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    from . import journal
+    from .catalog import CATALOG_DIR, SetCatalog
+    from .grading import normalize
+    from .interprocess import ChangeFeed
+    from .parser import iter_file_cards
+    from .set_cache import SET_CACHE
+except ImportError:  # running as a script
+    import journal
+    from catalog import CATALOG_DIR, SetCatalog
+    from grading import normalize
+    from interprocess import ChangeFeed
+    from parser import iter_file_cards
+    from set_cache import SET_CACHE
+
+THRESHOLD = 0.6
+SHINGLE = 3
+NUM_HASHES = 64
+BANDS = 32                # 32 bands x 2 rows: candidates found down to ~0.2 similarity
+ROWS = NUM_HASHES // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX = (1 << 32) - 1
+
+
+def _make_coefficients() -> List[Tuple[int, int]]:
+    """Fixed hash parameters so signatures are the same in every process."""
+    coefficients = []
+    for i in range(NUM_HASHES):
+        digest = hashlib.sha1(f"minhash-{i}".encode()).digest()
+        a, b = struct.unpack("<QQ", digest[:16])
+        coefficients.append((a % _PRIME or 1, b % _PRIME))
+    return coefficients
+
+
+_COEFFICIENTS = _make_coefficients()
+
+Card = Tuple[str, str]
+
+
+def shingles(text: str) -> Set[int]:
+    """Character shingles of normalized text, hashed to 32-bit ints."""
+    text = " " + text + " "
+    if len(text) <= SHINGLE:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+        for g in grams
+    }
+
+
+def minhash(features: Set[int]) -> Tuple[int, ...]:
+    return tuple(
+        min(((a * x + b) % _PRIME) & _MAX for x in features)
+        for a, b in _COEFFICIENTS
+    )
+
+
+def similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity from two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class DedupIndex:
+    """Cards seen so far, indexed for duplicate lookups."""
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self._exact: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._signatures: List[Tuple[int, ...]] = []
+        self._answers: List[str] = []
+        self.cards: List[Card] = []
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def find(self, question: str, answer: str) -> Optional[int]:
+        """Index of an existing card this one duplicates, or None."""
+        q_norm, a_norm = normalize(question), normalize(answer)
+        hit = self._exact.get(self._exact_key(q_norm, a_norm))
+        if hit is not None:
+            return hit
+        signature = minhash(shingles(q_norm))
+        return self._near(signature, a_norm)
+
+    def add(self, question: str, answer: str) -> Optional[int]:
+        """
+        Add a card unless it duplicates one already indexed.
+        Returns the index of the card it duplicates, or None if it was added.
+        """
+        q_norm, a_norm = normalize(question), normalize(answer)
+        exact_key = self._exact_key(q_norm, a_norm)
+        hit = self._exact.get(exact_key)
+        if hit is not None:
+            return hit
+        signature = minhash(shingles(q_norm))
+        hit = self._near(signature, a_norm)
+        if hit is not None:
+            return hit
+
+        idx = len(self.cards)
+        self.cards.append((question, answer))
+        self._exact[exact_key] = idx
+        self._signatures.append(signature)
+        self._answers.append(a_norm)
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS])
+            self._buckets.setdefault(key, []).append(idx)
+        return None
+
+    @staticmethod
+    def _exact_key(q_norm: str, a_norm: str) -> str:
+        return hashlib.sha1((q_norm + "\x1f" + a_norm).encode("utf-8")).hexdigest()
+
+    def _near(self, signature: Tuple[int, ...], a_norm: str) -> Optional[int]:
+        checked: Set[int] = set()
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS])
+            for idx in self._buckets.get(key, ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                if self._answers[idx] != a_norm:
+                    continue
+                if similarity(signature, self._signatures[idx]) >= self.threshold:
+                    return idx
+        return None
+
+
+def build_index(cards: Iterable[Card], threshold: float = THRESHOLD) -> DedupIndex:
+    index = DedupIndex(threshold)
+    for question, answer in cards:
+        index.add(question, answer)
+    return index
+
+
+def dedupe(cards: Iterable[Card], threshold: float = THRESHOLD) -> Tuple[List[Card], List[Tuple[Card, Card]]]:
+    """Split cards into (kept, [(dropped card, card it duplicates), ...])."""
+    index = DedupIndex(threshold)
+    dropped: List[Tuple[Card, Card]] = []
+    for card in cards:
+        hit = index.add(*card)
+        if hit is not None:
+            dropped.append((card, index.cards[hit]))
+    return index.cards, dropped
+
+
+# ---------- Offline compaction of existing logs ----------
+
+def _read_log(path: str):
+    """
+    Read a log as (format, cards, records, parsed JSON document or None).
+    records[i] is what gets written back for cards[i]: the card's original
+    object for JSON logs, so aliases and other fields are kept.
+    """
+    if not path.endswith(".json"):
+        cards = [(c.question, c.answer) for c in iter_file_cards(path)]
+        return "txt", cards, cards, None
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        # One JSON object per line, like manual_questions.json
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return "jsonl", _card_pairs(rows), rows, None
+    items = data.get("questions", []) if isinstance(data, dict) else data
+    items = [item for item in items if isinstance(item, dict)]
+    return "json", _card_pairs(items), items, data
+
+
+def _card_pairs(items: List[Dict]) -> List[Card]:
+    return [(str(r.get("question", "")), str(r.get("answer", ""))) for r in items]
+
+
+def _write_log(path: str, fmt: str, records: List, data=None) -> None:
+    """Atomically replace a log with the given records, in its own format."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".dedup.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if fmt == "txt":
+                for question, answer in records:
+                    f.write(question.strip() + "\n")
+                    f.write(answer.strip() + "\n\n")
+            elif fmt == "jsonl":
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            else:
+                if isinstance(data, dict):
+                    # Keep the set's other settings (strictness, journal_seq...)
+                    data = dict(data, questions=records)
+                else:
+                    data = records
+                json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _announce(path: str) -> None:
+    """
+    After rewriting a set, do what app.py does after its own writes: drop
+    the cached copy and, for a sets folder, update its catalog and tell
+    running workers through the change feed.
+    """
+    SET_CACHE.invalidate(path)
+    folder = os.path.dirname(os.path.abspath(path))
+    if os.path.isdir(os.path.join(folder, CATALOG_DIR)):
+        SetCatalog(folder).update(path)
+        ChangeFeed(os.path.join(folder, CATALOG_DIR, "changes.log")).publish(path)
+
+
+def compact_log(path: str, threshold: float = THRESHOLD, dry_run: bool = False) -> List[Tuple[Card, Card]]:
+    """
+    Remove duplicate cards from a log file in place, keeping first occurrences.
+
+    Holds the set's lock throughout, like every other write to a set. Cards
+    still in a JSON set's journal are folded into the set first, so they
+    are deduplicated too and a server appending at the same time waits.
+    """
+    with journal.set_lock(path):
+        if path.endswith(".json") and not dry_run:
+            journal.compact(path)
+        fmt, cards, records, data = _read_log(path)
+        if fmt == "json" and dry_run:
+            # Count the journal's cards too, without folding them in
+            applied = int(data.get("journal_seq", 0)) if isinstance(data, dict) else 0
+            pending = list(journal.read_journal(path, after_seq=applied))
+            cards += _card_pairs(pending)
+            records += pending
+
+        index = DedupIndex(threshold)
+        kept: List = []
+        dropped: List[Tuple[Card, Card]] = []
+        for i, card in enumerate(cards):
+            hit = index.add(*card)
+            if hit is None:
+                kept.append(records[i])
+            else:
+                dropped.append((card, index.cards[hit]))
+
+        if dropped and not dry_run:
+            _write_log(path, fmt, kept, data)
+            _announce(path)
+    return dropped
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Remove duplicate questions from logs/sets.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="minimum estimated similarity for a near-duplicate")
+    parser.add_argument("--dry-run", action="store_true", help="report without rewriting files")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        dropped = compact_log(path, args.threshold, args.dry_run)
+        action = "would remove" if args.dry_run else "removed"
+        print(f"{path}: {action} {len(dropped)} duplicate(s)")
+        for (question, _), (original, _) in dropped:
+            print(f"  - {question.strip()!r} duplicates {original.strip()!r}")
+
+
+if __name__ == "__main__":
+    main()
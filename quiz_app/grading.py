@@ -0,0 +1,240 @@
+"""
+Answer grading.
+
+Grading used to be an exact, case-insensitive comparison, so "da Vinci" for
+"Leonardo da Vinci" or "Seven" for "7" were marked wrong. Answers are now
+compared after normalization, at one of three strictness levels:
+
+  exact    trimmed, case-insensitive equality (the old behaviour)
+  normal   also ignores accents, punctuation, extra spaces and the articles
+           a/an/the, treats number words as digits ("seven" == "7") and
+           accepts any of the card's aliases
+  lenient  normal, plus small typos (bounded edit distance) and the last two
+           or more words of a multi-word answer ("da Vinci"), as long as
+           they don't start with a preposition or conjunction ("of America"
+           is not "United States of America")
+
+The default is normal, which does not accept a trailing part of the answer:
+"da Vinci" for "Leonardo da Vinci" needs lenient (a set's "strictness", or
+GRADING_STRICTNESS=lenient for every set). A tail can name something else:
+"Republic of China" ends "People's Republic of China".
+
+Answers containing digits are never fuzzy-matched: 1912 is not 1913.
+
+Normalized forms of each card's answer are computed once (PreparedAnswer)
+and memoized per parsed set (PreparedDeck), so checking a submission only
+normalizes the user's text and compares a few short strings.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STRICTNESS_LEVELS = ("exact", "normal", "lenient")
+DEFAULT_STRICTNESS = "normal"
+
+_ONES = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_SCALES = {"hundred": 100, "thousand": 1000, "million": 1000000, "billion": 1000000000}
+_ARTICLES = {"a", "an", "the"}
+# Words a lenient answer's tail may not start with: "of independence" is not
+# a short form of "Declaration of Independence". Name particles such as
+# "da" and "de" are not here, so "da Vinci" still counts.
+_FUNCTION_WORDS = {
+    "of", "in", "on", "at", "to", "for", "from", "by", "with", "into", "onto",
+    "upon", "about", "over", "under", "between", "than", "per", "via",
+    "and", "or", "nor", "but", "as",
+}
+
+_DIGIT_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3})")
+_NOT_WORD = re.compile(r"[^\w.]+|(?<!\d)\.|\.(?!\d)")
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _numbers_to_digits(tokens: List[str]) -> List[str]:
+    """Replace runs of number words with digits: ["twenty", "one"] -> ["21"]."""
+    out: List[str] = []
+    total = current = 0
+    in_number = False
+
+    def finish() -> None:
+        nonlocal total, current, in_number
+        if in_number:
+            out.append(str(total + current))
+        total = current = 0
+        in_number = False
+
+    for i, token in enumerate(tokens):
+        if token in _ONES:
+            current += _ONES[token]
+        elif token in _TENS:
+            current += _TENS[token]
+        elif token in _SCALES and in_number:
+            scale = _SCALES[token]
+            if scale == 100:
+                current *= 100
+            else:
+                total += current * scale
+                current = 0
+        elif token == "and" and in_number and i + 1 < len(tokens) and (
+            tokens[i + 1] in _ONES or tokens[i + 1] in _TENS
+        ):
+            continue
+        else:
+            finish()
+            out.append(token)
+            continue
+        in_number = True
+    finish()
+    return out
+
+
+def normalize(text: str) -> str:
+    """Canonical form used by the normal and lenient levels."""
+    text = _strip_accents(text).casefold()
+    text = _DIGIT_SEPARATOR.sub("", text)
+    text = _NOT_WORD.sub(" ", text).replace("_", " ")
+    tokens = [t for t in text.split() if t not in _ARTICLES]
+    return " ".join(_numbers_to_digits(tokens))
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """True if the Levenshtein distance between a and b is at most limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    # Only cells within `limit` of the diagonal can stay under the limit
+    big = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        current = [big] * (len(b) + 1)
+        current[0] = i if i <= limit else big
+        best = current[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return False
+        previous = current
+    return previous[len(b)] <= limit
+
+
+def typo_allowance(text: str) -> int:
+    """How many edits lenient grading forgives for an answer of this length."""
+    n = len(text)
+    if n <= 3:
+        return 0
+    if n <= 7:
+        return 1
+    if n <= 12:
+        return 2
+    return 3
+
+
+class PreparedAnswer:
+    """
+    A card's accepted answers, normalized ahead of time.
+
+    >>> PreparedAnswer("Leonardo da Vinci", strictness="lenient").matches("da Vinci")
+    True
+    >>> PreparedAnswer("Leonardo da Vinci").matches("da Vinci")
+    False
+    >>> PreparedAnswer("United States of America", strictness="lenient").matches("of America")
+    False
+    >>> PreparedAnswer("Declaration of Independence", strictness="lenient").matches("of independence")
+    False
+    """
+
+    __slots__ = ("answer", "strictness", "exact", "forms", "suffixes")
+
+    def __init__(self, answer: str, aliases: Sequence[str] = (),
+                 strictness: str = DEFAULT_STRICTNESS):
+        if strictness not in STRICTNESS_LEVELS:
+            raise ValueError(f"Unknown strictness: {strictness!r}")
+        self.answer = answer
+        self.strictness = strictness
+        accepted = [answer] + [a for a in aliases if a]
+        self.exact = {a.strip().lower() for a in accepted}
+        self.forms: Tuple[str, ...] = ()
+        self.suffixes: Tuple[str, ...] = ()
+        if strictness != "exact":
+            self.forms = tuple({normalize(a) for a in accepted})
+        if strictness == "lenient":
+            suffixes = set()
+            for form in self.forms:
+                words = form.split()
+                for k in range(2, len(words)):
+                    if words[-k] not in _FUNCTION_WORDS:
+                        suffixes.add(" ".join(words[-k:]))
+            self.suffixes = tuple(suffixes)
+
+    def matches(self, user_answer: str) -> bool:
+        if user_answer.strip().lower() in self.exact:
+            return True
+        if self.strictness == "exact":
+            return False
+
+        given = normalize(user_answer)
+        if not given:
+            return False
+        if given in self.forms:
+            return True
+        if self.strictness != "lenient":
+            return False
+
+        if given in self.suffixes:
+            return True
+        if any(ch.isdigit() for ch in given):
+            return False
+        for form in self.forms:
+            if any(ch.isdigit() for ch in form):
+                continue
+            if within_distance(given, form, typo_allowance(form)):
+                return True
+        return False
+
+
+class PreparedDeck:
+    """
+    PreparedAnswer for every card of a set, built the first time each card
+    is graded and then reused for every later submission.
+    """
+
+    def __init__(self, cards: Sequence[Tuple[str, str]], strictness: str = DEFAULT_STRICTNESS,
+                 aliases: Optional[Dict[int, List[str]]] = None):
+        self.cards = cards
+        self.strictness = strictness
+        self.aliases = aliases or {}
+        self._prepared: Dict[int, PreparedAnswer] = {}
+
+    def __getitem__(self, index: int) -> PreparedAnswer:
+        prepared = self._prepared.get(index)
+        if prepared is None:
+            prepared = self._prepared[index] = PreparedAnswer(
+                self.cards[index][1], self.aliases.get(index, ()), self.strictness
+            )
+        return prepared
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def check(self, index: int, user_answer: str) -> bool:
+        return self[index].matches(user_answer)
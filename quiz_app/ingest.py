@@ -0,0 +1,117 @@
+"""
+Streaming ingestion for uploaded .txt question sets.
+
+The upload is read in bounded chunks. Each line is written to a temp file
+next to the destination and fed straight into the streaming parser, so the
+set is validated while it is being received:
+
+- Uploads larger than max_bytes are rejected (UploadTooLarge) and nothing
+  is kept. So are uploads with a line longer than MAX_LINE_BYTES.
+- Uploads with no valid cards are rejected (EmptyUpload).
+- Otherwise the temp file is renamed into place, a pre-parsed copy is
+  written (see preparsed.py) and an IngestReport with the card count and
+  any rejected lines is returned.
+
+Parsed cards are not collected in memory either: they go straight into the
+pre-parsed copy's DeckWriter, which keeps only an offset table.
+"""
+
+import os
+import tempfile
+from typing import BinaryIO, Iterator, List
+
+try:
+    from .parser import RejectedLine, iter_cards
+    from .preparsed import finish_preparsed, preparsed_writer
+except ImportError:  # running as a script
+    from parser import RejectedLine, iter_cards
+    from preparsed import finish_preparsed, preparsed_writer
+
+# Longest line we accept
+MAX_LINE_BYTES = 64 * 1024
+
+# How many rejected lines to keep for the report
+MAX_REPORTED = 100
+
+
+class UploadError(Exception):
+    """An upload that can't be turned into a set."""
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+class EmptyUpload(UploadError):
+    def __init__(self, rejected: List[RejectedLine]):
+        super().__init__("No questions found in upload.")
+        self.rejected = rejected
+
+
+class IngestReport:
+    """What happened to one upload."""
+
+    def __init__(self, path: str, cards: int, rejected: List[RejectedLine],
+                 rejected_total: int, size: int):
+        self.path = path
+        self.cards = cards
+        self.rejected = rejected            # first MAX_REPORTED problems
+        self.rejected_total = rejected_total
+        self.size = size
+
+
+def _tee_lines(stream: BinaryIO, sink: BinaryIO, max_bytes: int,
+               counter: List[int]) -> Iterator[bytes]:
+    """
+    Yield lines from stream while copying them to sink. Raises UploadTooLarge
+    as soon as more than max_bytes have been read, and UploadError for a line
+    longer than MAX_LINE_BYTES.
+    """
+    line_no = 0
+    while True:
+        line = stream.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        line_no += 1
+        counter[0] += len(line)
+        if counter[0] > max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes.")
+        if len(line) > MAX_LINE_BYTES:
+            raise UploadError(f"Line {line_no} is longer than {MAX_LINE_BYTES} bytes.")
+        sink.write(line)
+        yield line
+
+
+def ingest_text_upload(stream: BinaryIO, dest_path: str, max_bytes: int) -> IngestReport:
+    """Validate and store an uploaded .txt set at dest_path."""
+    folder = os.path.dirname(os.path.abspath(dest_path))
+    rejected: List[RejectedLine] = []
+    rejected_total = [0]
+    counter = [0]
+
+    def on_reject(line: RejectedLine) -> None:
+        rejected_total[0] += 1
+        if len(rejected) < MAX_REPORTED:
+            rejected.append(line)
+
+    has_answer = False
+    with preparsed_writer(dest_path) as deck:
+        fd, tmp = tempfile.mkstemp(dir=folder, prefix=".upload.", suffix=".txt")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                for card in iter_cards(_tee_lines(stream, sink, max_bytes, counter), on_reject):
+                    deck.add(card.question, card.answer)
+                    has_answer = has_answer or bool(card.answer)
+
+            if not has_answer:
+                raise EmptyUpload(rejected)
+
+            os.replace(tmp, dest_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        count = len(deck)
+        finish_preparsed(dest_path, deck)
+    return IngestReport(dest_path, count, rejected, rejected_total[0], counter[0])
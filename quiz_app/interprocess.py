@@ -0,0 +1,198 @@
+"""
+Coordination between several processes serving the same sets folder.
+
+FileLock   an exclusive lock held through a lock file (fcntl.flock on Unix,
+           msvcrt.locking on Windows), so writes to a set or to the catalog
+           from different workers don't interleave. It is also a normal
+           re-entrant lock between threads of one process.
+
+ChangeFeed an append-only file listing the set files that were just
+           written. Every worker polls it (one stat per request) and drops
+           exactly those files from its in-memory caches, instead of each
+           worker finding out on its own from mtimes.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+def _lock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                time.sleep(0.05)
+
+
+def _try_lock_fd(fd: int) -> bool:
+    """Like _lock_fd, but returns False at once if another process holds the lock."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Re-entrant lock shared by threads (in-process) and processes (lock file)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    _lock_fd(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def try_acquire(self) -> bool:
+        """acquire() without waiting: False if another thread or process holds the lock."""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if not _try_lock_fd(fd):
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock_fd(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class ChangeFeed:
+    """
+    Shared list of changed set files.
+
+    publish() appends absolute paths, one per line, each tagged with the
+    publishing process's pid. poll() returns the paths other processes
+    published since the last poll (a process has already applied its own
+    changes), or None if this process can't tell (the feed was rotated), in
+    which case callers should drop everything.
+    """
+
+    # Start a new feed file once the current one reaches this size
+    MAX_BYTES = 1024 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._write_lock = FileLock(path + ".lock")
+        self._poll_lock = threading.Lock()
+        try:
+            st = os.stat(path)
+            self._inode: Optional[int] = st.st_ino
+            self._offset = st.st_size
+        except FileNotFoundError:
+            self._inode = None
+            self._offset = 0
+
+    def publish(self, *paths: str) -> None:
+        pid = os.getpid()
+        lines = "".join(f"{pid}\t{os.path.abspath(p)}\n" for p in paths)
+        if not lines:
+            return
+        with self._write_lock:
+            try:
+                if os.path.getsize(self.path) >= self.MAX_BYTES:
+                    # Swap in a fresh file (new inode) so readers notice the reset
+                    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+                    os.close(fd)
+                    os.replace(tmp, self.path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def poll(self) -> Optional[List[str]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        with self._poll_lock:
+            if self._inode is None:
+                # The feed didn't exist when we started: everything in it is new
+                self._inode, self._offset = st.st_ino, 0
+            elif st.st_ino != self._inode:
+                self._inode, self._offset = st.st_ino, 0
+                return None
+            if st.st_size == self._offset:
+                return []
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+            # Leave a line that is still being written for the next poll
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+            lines = data[:end].decode("utf-8", errors="replace").splitlines()
+        own = str(os.getpid())
+        changed = []
+        for line in lines:
+            origin, sep, path = line.partition("\t")
+            if not (sep and origin.isdigit()):
+                changed.append(line)  # untagged line from an older version
+            elif origin != own:
+                changed.append(path)
+        return changed
@@ -0,0 +1,223 @@
+"""
+Append-only journal for changes to JSON question sets.
+
+Adding a card used to read the whole set, append one card and rewrite the
+whole file. Now the card is appended as one JSON line to a journal next to
+the set:
+
+    flashcard_sets/Kimheat.json                 <- canonical set
+    flashcard_sets/.journal/Kimheat.json.jsonl  <- cards added since
+
+Each journal line looks like the entries in manual_questions.json plus a
+sequence number:
+
+    {"seq": 3, "question": "...", "answer": "..."}
+
+When a journal grows past COMPACT_BYTES it is folded back into the canonical
+JSON file. The canonical file records the last sequence number it contains
+("journal_seq"), so replaying is safe even if we crash half way through a
+compaction. All writes to a set go through a per-set lock (a lock file in
+.locks/, so it also holds between worker processes), and the canonical file
+is only ever replaced atomically (temp file + rename).
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    from .interprocess import FileLock
+except ImportError:  # running as a script
+    from interprocess import FileLock
+
+JOURNAL_DIR = ".journal"
+LOCK_DIR = ".locks"
+
+# Fold the journal into the set once it reaches this size
+COMPACT_BYTES = int(os.environ.get("JOURNAL_COMPACT_BYTES", 256 * 1024))
+
+_locks: Dict[str, FileLock] = {}
+_locks_guard = threading.Lock()
+
+
+def set_lock(set_path: str) -> FileLock:
+    """The lock guarding every write to one set, across threads and processes."""
+    key = os.path.abspath(set_path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            folder, filename = os.path.split(key)
+            lock = _locks[key] = FileLock(os.path.join(folder, LOCK_DIR, filename + ".lock"))
+        return lock
+
+
+def journal_path(set_path: str) -> str:
+    folder, filename = os.path.split(os.path.abspath(set_path))
+    return os.path.join(folder, JOURNAL_DIR, filename + ".jsonl")
+
+
+def read_journal(set_path: str, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield journal entries newer than after_seq. A torn last line (crash
+    mid-append) is ignored, as is any line that isn't a journal entry.
+    """
+    path = journal_path(set_path)
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            seq = entry.get("seq", 0)
+            if isinstance(seq, int) and seq > after_seq:
+                yield entry
+
+
+def atomic_write_json(path: str, data: Any, indent: int = 4) -> None:
+    """Write JSON to a temp file in the same folder, fsync, then rename over path."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp.", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _read_canonical(set_path: str) -> Dict[str, Any]:
+    """The canonical set as {"questions": [...], ...}; lists are converted."""
+    if not os.path.exists(set_path):
+        return {"questions": []}
+    with open(set_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"questions": data}
+    return data
+
+
+def last_seq(set_path: str) -> int:
+    """Highest sequence number used so far, read from the journal's tail."""
+    path = journal_path(set_path)
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 64 * 1024))
+            tail = f.read().decode("utf-8", errors="ignore").splitlines()
+    except FileNotFoundError:
+        tail = []
+
+    for line in reversed(tail):
+        try:
+            return int(json.loads(line)["seq"])
+        except (ValueError, KeyError, TypeError):
+            continue
+
+    # Empty journal: continue from what the canonical file already contains
+    return int(_read_canonical(set_path).get("journal_seq", 0))
+
+
+def create_set(set_path: str) -> None:
+    """Create an empty canonical set if it doesn't exist yet."""
+    with set_lock(set_path):
+        if not os.path.exists(set_path):
+            atomic_write_json(set_path, {"questions": []})
+
+
+def append_cards(set_path: str, cards: List[Tuple[str, str]]) -> int:
+    """
+    Append cards to a JSON set's journal (creating the set if needed).
+    Compacts the journal when it gets large. Returns the last sequence
+    number written.
+    """
+    if not cards:
+        return last_seq(set_path)
+    path = journal_path(set_path)
+    with set_lock(set_path):
+        if not os.path.exists(set_path):
+            atomic_write_json(set_path, {"questions": []})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        seq = last_seq(set_path)
+        lines = []
+        for question, answer in cards:
+            seq += 1
+            lines.append(json.dumps({"seq": seq, "question": question, "answer": answer}))
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        if os.path.getsize(path) >= COMPACT_BYTES:
+            _compact_locked(set_path)
+        return seq
+
+
+def append_card(set_path: str, question: str, answer: str) -> int:
+    return append_cards(set_path, [(question, answer)])
+
+
+def compact(set_path: str) -> int:
+    """Fold the journal into the canonical file. Returns cards folded in."""
+    with set_lock(set_path):
+        return _compact_locked(set_path)
+
+
+def _compact_locked(set_path: str) -> int:
+    path = journal_path(set_path)
+    if not os.path.exists(path):
+        return 0
+
+    data = _read_canonical(set_path)
+    applied = int(data.get("journal_seq", 0))
+    added = 0
+    for entry in read_journal(set_path, after_seq=applied):
+        data["questions"].append({"question": entry["question"], "answer": entry["answer"]})
+        applied = entry["seq"]
+        added += 1
+
+    data["journal_seq"] = applied
+    atomic_write_json(set_path, data)
+    # The canonical file now has everything up to journal_seq, so dropping
+    # the journal is safe; a crash before this line just replays nothing new.
+    os.unlink(path)
+    return added
+
+
+def compact_all(folder: str) -> Dict[str, int]:
+    """Compact every journal in a sets folder. Returns {set file: cards folded}."""
+    results: Dict[str, int] = {}
+    journal_folder = os.path.join(folder, JOURNAL_DIR)
+    if not os.path.isdir(journal_folder):
+        return results
+    for name in os.listdir(journal_folder):
+        if name.endswith(".jsonl"):
+            set_file = name[: -len(".jsonl")]
+            results[set_file] = compact(os.path.join(folder, set_file))
+    return results
+
+
+if __name__ == "__main__":
+    # python -m quiz_app.journal [sets_folder]  -> compact every journal now
+    import sys
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else "flashcard_sets"
+    for set_file, added in compact_all(folder).items():
+        print(f"{set_file}: folded {added} journaled cards")
@@ -0,0 +1,237 @@
+"""
+Request metrics and optional profiling for the web app.
+
+Collects, in process:
+
+  flashcard_request_seconds           latency histogram per route/method/status
+  flashcard_phase_seconds             time spent in set loading, quiz state
+                                      storage and template rendering
+  flashcard_session_cookie_bytes      size of the session cookie sent back
+  flashcard_quiz_state_bytes          size of the saved quiz state
+  flashcard_set_cache_*               parsed-set cache counters and sizes
+                                      (read at scrape, see stats())
+
+and renders them in the Prometheus text format for the /metrics endpoint.
+
+Profiling is off unless PROFILE_REQUESTS is set: a value between 0 and 1 is
+the fraction of requests profiled with cProfile, and each profile is written
+to PROFILE_DIR as a .prof file (open it with `python -m pstats` or snakeviz).
+"""
+
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; suits anything from a cached page to parsing a big upload
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Labels, List[float]] = {}   # labels -> bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = 'le="' + _format_number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le)} {count}")
+            inf = _format_labels(labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_number(value)}")
+        return lines
+
+
+class Metrics:
+    """The app's metrics plus component stats that are read when /metrics is scraped."""
+
+    def __init__(self):
+        self.requests = Histogram(
+            "flashcard_request_seconds", "Time to handle a request, by route."
+        )
+        self.phases = Histogram(
+            "flashcard_phase_seconds", "Time spent in parts of a request (set_load, quiz_store, render)."
+        )
+        self.session_bytes = Histogram(
+            "flashcard_session_cookie_bytes", "Size of the session cookie set on responses.", SIZE_BUCKETS
+        )
+        self.state_bytes = Histogram(
+            "flashcard_quiz_state_bytes", "Size of the quiz state saved per answer.", SIZE_BUCKETS
+        )
+        self.profiles = Counter(
+            "flashcard_profiled_requests_total", "Requests profiled with cProfile."
+        )
+        self._stats: Dict[str, Tuple[Callable[[], Dict[str, float]], Dict[str, str], frozenset]] = {}
+
+    def stats(self, prefix: str, read: Callable[[], Dict[str, float]],
+              help_texts: Dict[str, str], gauges: Iterable[str] = ()) -> None:
+        """
+        Export read()'s values on every scrape. Keys listed in gauges (sizes,
+        current counts) become prefix_<key> gauges; every other key is a
+        running total and becomes a prefix_<key>_total counter. help_texts
+        gives each key its HELP line.
+        """
+        self._stats[prefix] = (read, help_texts, frozenset(gauges))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.observe(time.perf_counter() - start, phase=name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.requests, self.phases, self.session_bytes, self.state_bytes, self.profiles):
+            lines.extend(metric.render())
+        for prefix, (read, help_texts, gauges) in sorted(self._stats.items()):
+            for key, value in sorted(read().items()):
+                kind = "gauge" if key in gauges else "counter"
+                name = f"{prefix}_{key}" if kind == "gauge" else f"{prefix}_{key}_total"
+                help_text = help_texts.get(key, key.replace("_", " ").capitalize() + ".")
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def init_app(app, metrics: Metrics = METRICS) -> Metrics:
+    """
+    Time every request of a Flask app and add the /metrics endpoint.
+
+    Reads PROFILE_REQUESTS (fraction of requests to profile, default 0) and
+    PROFILE_DIR (where .prof files go) from app.config.
+    """
+    from flask import Response, before_render_template, g, request, session, template_rendered
+
+    app.config.setdefault("PROFILE_REQUESTS", float(os.environ.get("PROFILE_REQUESTS", 0) or 0))
+    app.config.setdefault("PROFILE_DIR", os.environ.get("PROFILE_DIR", "profiles"))
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        rate = app.config["PROFILE_REQUESTS"]
+        if rate and random.random() < rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return  # another request on this process is being profiled
+            g.profiler = profiler
+
+    @app.after_request
+    def record_request(response):
+        profiler: Optional[cProfile.Profile] = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _save_profile(profiler, app.config["PROFILE_DIR"], request.endpoint or "unmatched")
+            metrics.profiles.inc(route=request.endpoint or "unmatched")
+
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.requests.observe(
+                time.perf_counter() - start,
+                route=route, method=request.method, status=str(response.status_code),
+            )
+        # The cookie itself is written after this hook, so measure what it will contain
+        if session.modified and session:
+            serializer = app.session_interface.get_signing_serializer(app)
+            if serializer is not None:
+                metrics.session_bytes.observe(len(serializer.dumps(dict(session))))
+        return response
+
+    def render_started(sender, template, context, **extra):
+        g.render_start = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        start = g.pop("render_start", None)
+        if start is not None:
+            metrics.phases.observe(time.perf_counter() - start, phase="render")
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
+
+
+def _save_profile(profiler: cProfile.Profile, folder: str, endpoint: str) -> None:
+    os.makedirs(folder, exist_ok=True)
+    name = f"{endpoint}-{time.time():.6f}.prof"
+    profiler.dump_stats(os.path.join(folder, name))
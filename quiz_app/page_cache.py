@@ -0,0 +1,104 @@
+"""
+Rendered-page cache with conditional GETs.
+
+Pages that are the same for every visitor (home, instructions, the upload
+form, the set list) are rendered once per version of what they show and
+then served from memory:
+
+- the version of a template page is the template file's mtime; the set
+  list's is the catalog's version_key(), so the list is re-rendered only
+  after a set is added, changed or removed
+- responses carry an ETag (page + version) and Last-Modified, and a browser
+  or proxy that sends them back gets a 304 without any rendering
+- a visitor with flashed messages waiting gets a freshly rendered page, since
+  those messages are part of it
+
+Old versions are never looked up again and age out of the LRU.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+MAX_PAGES = 256
+
+
+def page_etag(key: str, version: str) -> str:
+    return hashlib.sha1(f"{key}\x1f{version}".encode("utf-8")).hexdigest()[:20]
+
+
+def not_modified(request, etag: str, last_modified: float) -> bool:
+    """
+    True if the client's copy is current: its If-None-Match lists etag, or
+    (without If-None-Match) its If-Modified-Since is not older than the page.
+    Works with Flask and Quart requests.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if since is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole seconds
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
+def http_date(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+class PageCache:
+    """LRU of rendered HTML by (page key, version)."""
+
+    STATS_HELP = {
+        "hits": "Shared pages served from the rendered-page cache.",
+        "misses": "Shared pages rendered because no cached copy matched.",
+        "not_modified": "Shared pages answered with 304 Not Modified.",
+        "pages": "Rendered pages currently cached.",
+    }
+    STATS_GAUGES = ("pages",)
+
+    def __init__(self, max_pages: int = MAX_PAGES):
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str, version: str) -> Optional[str]:
+        with self._lock:
+            body = self._pages.get((key, version))
+            if body is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end((key, version))
+            self.hits += 1
+            return body
+
+    def put(self, key: str, version: str, body: str) -> None:
+        with self._lock:
+            self._pages[(key, version)] = body
+            self._pages.move_to_end((key, version))
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "pages": len(self._pages),
+            }
@@ -0,0 +1,99 @@
+"""
+Streaming parser for the plain text question format.
+
+    What is the capital of France?
+    Paris
+
+    Who founded Babson College?
+    Roger Babson
+
+- A line ending in '?' is a question.
+- The next non-blank line is its answer.
+- Blank lines are ignored.
+
+Cards are yielded one at a time while the file is read line by line, so even
+very large files are parsed in constant memory. Lines that don't fit the
+format can be reported through an on_reject callback, with their line number
+and byte offset.
+"""
+
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple, Optional
+
+
+class ParsedCard(NamedTuple):
+    question: str
+    answer: str
+    line: int      # 1-based line number of the question
+    offset: int    # byte offset of the question line
+
+
+class RejectedLine(NamedTuple):
+    line: int
+    offset: int
+    text: str
+    reason: str
+
+
+RejectCallback = Callable[[RejectedLine], None]
+
+
+def iter_cards(
+    lines: Iterable[bytes],
+    on_reject: Optional[RejectCallback] = None,
+) -> Iterator[ParsedCard]:
+    """
+    Parse raw lines (bytes, as read from a file opened in binary mode) into
+    cards. A question at the very end with no answer is still yielded with
+    an empty answer, but it is also reported to on_reject.
+    """
+    pending = None  # (question, line, offset) waiting for its answer
+    offset = 0
+
+    for line_no, raw in enumerate(lines, start=1):
+        start = offset
+        offset += len(raw)
+
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            if on_reject:
+                on_reject(RejectedLine(line_no, start, repr(raw[:80]), "not valid UTF-8"))
+            continue
+
+        if line_no == 1:
+            text = text.lstrip("\ufeff")  # byte order mark from some editors
+        text = text.strip()
+        if not text:
+            continue
+
+        if pending is not None:
+            question, q_line, q_offset = pending
+            pending = None
+            yield ParsedCard(question, text, q_line, q_offset)
+        elif text.endswith("?"):
+            pending = (text, line_no, start)
+        elif on_reject:
+            on_reject(RejectedLine(line_no, start, text, "not a question (no '?') and not an answer"))
+
+    if pending is not None:
+        question, q_line, q_offset = pending
+        if on_reject:
+            on_reject(RejectedLine(q_line, q_offset, question, "question has no answer"))
+        yield ParsedCard(question, "", q_line, q_offset)
+
+
+def iter_file_cards(
+    path: str,
+    on_reject: Optional[RejectCallback] = None,
+) -> Iterator[ParsedCard]:
+    """Stream cards from a text file on disk."""
+    with open(path, "rb") as f:
+        yield from iter_cards(f, on_reject)
+
+
+def iter_stream_cards(
+    stream: BinaryIO,
+    on_reject: Optional[RejectCallback] = None,
+) -> Iterator[ParsedCard]:
+    """Stream cards from an already-open binary stream (e.g. an upload)."""
+    yield from iter_cards(stream, on_reject)
@@ -0,0 +1,149 @@
+"""
+Pre-parsed copies of question sets.
+
+A set can have a compact binary copy (see deck_format.py) in a hidden folder
+next to the source:
+
+    flashcard_sets/Quiz_2.txt
+    flashcard_sets/.parsed/Quiz_2.txt.deck
+
+Uploads write one straight away; deck_format.py can convert existing sets.
+The copy records the signature (mtime and size) of the source it was built
+from, and of the source's journal for JSON sets. It is only used while that
+signature still matches, so editing a set by hand simply falls back to
+parsing the source again.
+
+A JSON set's settings (strictness, aliases, journal position) are not part
+of the deck; they are saved beside it (Quiz_1.json.deck.meta) with the same
+signature, so loading the set from its deck never reads the source.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    from .deck_format import DeckFile, DeckFormatError, DeckWriter, write_deck
+    from .journal import journal_path
+except ImportError:  # running as a script
+    from deck_format import DeckFile, DeckFormatError, DeckWriter, write_deck
+    from journal import journal_path
+
+PARSED_DIR = ".parsed"
+
+Card = Tuple[str, str]
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file; raises FileNotFoundError if it is missing."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def set_signature(path: str) -> Tuple[int, ...]:
+    """Signature of a set: the file itself plus its journal, if it has one."""
+    signature = file_signature(path)
+    if path.endswith(".json"):
+        try:
+            signature += file_signature(journal_path(path))
+        except FileNotFoundError:
+            pass
+    return signature
+
+
+def preparsed_path(set_path: str) -> str:
+    folder, filename = os.path.split(os.path.abspath(set_path))
+    return os.path.join(folder, PARSED_DIR, filename + ".deck")
+
+
+def preparsed_meta_path(set_path: str) -> str:
+    return preparsed_path(set_path) + ".meta"
+
+
+def write_preparsed(set_path: str, cards: Iterable[Card],
+                    signature: Optional[Tuple[int, ...]] = None,
+                    meta: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Write the deck copy of set_path (which must already be in place), and
+    for a JSON set its settings too when meta is given.
+    """
+    if signature is None:
+        signature = set_signature(set_path)
+    out = preparsed_path(set_path)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    write_deck(out, cards, signature)
+    if meta is not None and set_path.endswith(".json"):
+        write_preparsed_meta(set_path, meta, signature)
+    return out
+
+
+def write_preparsed_meta(set_path: str, meta: Dict[str, Any],
+                         signature: Tuple[int, ...]) -> None:
+    """Save a JSON set's settings next to its deck copy (atomically)."""
+    out = preparsed_meta_path(set_path)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(out), prefix=".tmp.", suffix=".meta")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"signature": list(signature), "meta": meta}, f)
+        os.replace(tmp, out)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def read_preparsed_meta(set_path: str,
+                        signature: Tuple[int, ...]) -> Optional[Dict[str, Any]]:
+    """A JSON set's saved settings, or None if missing or not for signature."""
+    try:
+        with open(preparsed_meta_path(set_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if tuple(data["signature"]) != tuple(signature):
+            return None
+        meta = data["meta"]
+        if "aliases" in meta:
+            # JSON object keys are strings; aliases are keyed by card index
+            meta["aliases"] = {int(i): a for i, a in meta["aliases"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return meta
+
+
+def preparsed_writer(set_path: str) -> DeckWriter:
+    """
+    A DeckWriter for set_path's deck copy, to stream cards into while the
+    set itself is still being written. Finish it with finish_preparsed().
+    """
+    folder = os.path.dirname(preparsed_path(set_path))
+    os.makedirs(folder, exist_ok=True)
+    return DeckWriter(folder)
+
+
+def finish_preparsed(set_path: str, writer: DeckWriter,
+                     signature: Optional[Tuple[int, ...]] = None) -> str:
+    """Write the deck copy built by writer (set_path must now be in place)."""
+    if signature is None:
+        signature = set_signature(set_path)
+    out = preparsed_path(set_path)
+    writer.finish(out, signature)
+    return out
+
+
+def read_preparsed(set_path: str,
+                   signature: Optional[Tuple[int, ...]] = None) -> Optional[DeckFile]:
+    """The memory-mapped deck for set_path, or None if missing or stale."""
+    path = preparsed_path(set_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        if signature is None:
+            signature = set_signature(set_path)
+        deck = DeckFile(path)
+    except (OSError, DeckFormatError):
+        return None
+    if deck.signature != tuple(signature):
+        deck.close()
+        return None
+    return deck
@@ -14,39 +14,54 @@ Users can:
 """
 
 import os
-import json
-import random
-from dataclasses import dataclass
-from typing import List, Dict, Any
+import getpass
+from typing import List, Dict, Any, Sequence
+
+try:
+    from .cards import DeckView, Flashcard
+    from .set_cache import load_set
+    from .scheduler import ScheduleStore, Scheduler, card_key
+    from .card_stats import CardStatsStore
+    from .results_store import ResultsStore
+    from .analytics import Analytics, format_summary
+    from .grading import PreparedDeck
+    from .search import SearchIndex, folder_files
+    from .dedup import DedupIndex, build_index
+    from .preparsed import set_signature
+except ImportError:  # running as a script: python quiz_app.py
+    from cards import DeckView, Flashcard
+    from set_cache import load_set
+    from scheduler import ScheduleStore, Scheduler, card_key
+    from card_stats import CardStatsStore
+    from results_store import ResultsStore
+    from analytics import Analytics, format_summary
+    from grading import PreparedDeck
+    from search import SearchIndex, folder_files
+    from dedup import DedupIndex, build_index
+    from preparsed import set_signature
 
 # Base directory (folder where this file lives)
 BASE_DIR = os.path.dirname(__file__)
 
-# File to store quiz performance results
+# Quiz performance results used to be kept here; they are now in the results
+# database and this file is only read once to import old history
 RESULTS_FILE = os.path.join(BASE_DIR, "quiz_results.json")
 
 # File to store ALL manually entered questions (append-only log)
 MANUAL_LOG_FILE = os.path.join(BASE_DIR, "manual_questions_log.txt")
 
+# Question sets uploaded or created through the web app
+SETS_FOLDER = os.path.join(BASE_DIR, os.pardir, "flashcard_sets")
 
-# ---------- Data model ----------
-
-@dataclass
-class Flashcard:
-    question: str
-    answer: str
-    times_seen: int = 0
-    times_correct: int = 0
 
-    @property
-    def mistakes(self) -> int:
-        """How many times this card has been missed overall."""
-        return max(0, self.times_seen - self.times_correct)
+# ---------- Data model ----------
+# Flashcard (a slotted card) and DeckView (cards created on first access)
+# live in cards.py and are shared with the web app.
 
 
 # ---------- Loading & saving questions ----------
 
-def load_questions_from_file(path: str) -> List[Flashcard]:
+def load_questions_from_file(path: str) -> DeckView:
     """
     Load Q&A pairs from a plain text file.
 
@@ -55,36 +70,29 @@ def load_questions_from_file(path: str) -> List[Flashcard]:
       - The line immediately following a question is its answer.
       - Blank lines are allowed and ignored.
     """
-    cards: List[Flashcard] = []
-
     if not os.path.exists(path):
         raise FileNotFoundError(f"File does not exist: {path}")
 
-    # Read file lines and strip whitespace
-    with open(path, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f.readlines()]
-
-    # Remove blank lines
-    lines = [line for line in lines if line]
+    # Parsed sets are shared with the web app and cached until the file changes;
+    # Flashcard objects are only created for the cards actually asked
+    return DeckView(load_set(path).cards)
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
 
-        if line.endswith("?"):
-            question = line
-            answer = ""
+# Duplicate index over the manual log, kept in step with our own appends so
+# checking new questions doesn't rescan the log
+_manual_index = None
+_manual_signature = None
 
-            # The next line should be the answer
-            if i + 1 < len(lines):
-                answer = lines[i + 1].strip()
-                i += 1  # skip answer line
 
-            cards.append(Flashcard(question=question, answer=answer))
-
-        i += 1
-
-    return cards
+def manual_log_index() -> DedupIndex:
+    """Duplicate index for MANUAL_LOG_FILE, rebuilt only if someone else changed it."""
+    global _manual_index, _manual_signature
+    signature = set_signature(MANUAL_LOG_FILE) if os.path.exists(MANUAL_LOG_FILE) else None
+    if _manual_index is None or signature != _manual_signature:
+        cards = load_set(MANUAL_LOG_FILE).cards if signature is not None else ()
+        _manual_index = build_index(cards)
+        _manual_signature = signature
+    return _manual_index
 
 
 def append_cards_to_manual_log(cards: List[Flashcard]) -> None:
@@ -97,14 +105,28 @@ def append_cards_to_manual_log(cards: List[Flashcard]) -> None:
 
     (blank line between pairs)
 
-    This file will grow over time as more users manually enter questions.
+    Questions that duplicate (or nearly duplicate) one already in the log
+    are skipped. Run `python -m quiz_app.dedup` to clean up older logs.
     """
-    with open(MANUAL_LOG_FILE, "a", encoding="utf-8") as f:
-        for card in cards:
-            f.write(card.question.strip() + "\n")
-            f.write(card.answer.strip() + "\n\n")
+    global _manual_signature
+    index = manual_log_index()
+    new_cards = []
+    for card in cards:
+        original = index.add(card.question, card.answer)
+        if original is None:
+            new_cards.append(card)
+        else:
+            print(f"Skipped duplicate: {card.question.strip()} "
+                  f"(already logged as: {index.cards[original][0].strip()})")
 
-    print(f"Logged {len(cards)} manually entered questions to {MANUAL_LOG_FILE}")
+    if new_cards:
+        with open(MANUAL_LOG_FILE, "a", encoding="utf-8") as f:
+            for card in new_cards:
+                f.write(card.question.strip() + "\n")
+                f.write(card.answer.strip() + "\n\n")
+        _manual_signature = set_signature(MANUAL_LOG_FILE)
+
+    print(f"Logged {len(new_cards)} manually entered questions to {MANUAL_LOG_FILE}")
 
 
 def manual_entry() -> List[Flashcard]:
@@ -151,22 +173,32 @@ def manual_entry() -> List[Flashcard]:
 
 # ---------- Persistence: saving & loading results ----------
 
-def load_results() -> Dict[str, Any]:
-    """Load past quiz results from disk if available."""
-    if not os.path.exists(RESULTS_FILE):
-        return {}
+_results_store = None
+
+
+def results_store() -> ResultsStore:
+    """The results database (quiz_results.json is imported into it on first use)."""
+    global _results_store
+    if _results_store is None:
+        _results_store = ResultsStore(legacy_json=RESULTS_FILE)
+    return _results_store
+
 
-    try:
-        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+_analytics = None
 
 
-def save_results(all_results: Dict[str, Any]) -> None:
-    """Save all quiz results to disk."""
-    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(all_results, f, indent=2)
+def analytics() -> Analytics:
+    """Running per-quiz and per-card summaries (kept up to date as rounds are saved)."""
+    global _analytics
+    if _analytics is None:
+        results_store()  # creates the summary tables and folds in older rounds
+        _analytics = Analytics()
+    return _analytics
+
+
+def load_results() -> Dict[str, Any]:
+    """Load past quiz results for every quiz."""
+    return results_store().all_results()
 
 
 def record_session_result(
@@ -177,26 +209,21 @@ def record_session_result(
     score_percent: float,
 ) -> None:
     """Append a new session result for this quiz."""
-    all_results = load_results()
-    session_data = {
-        "round": round_number,
-        "total_questions": total_questions,
-        "correct_answers": correct_answers,
-        "score_percent": score_percent,
-    }
-    all_results.setdefault(quiz_name, []).append(session_data)
-    save_results(all_results)
+    results_store().append(
+        quiz_name, round_number, total_questions, correct_answers, score_percent
+    )
 
 
 def show_previous_results(quiz_name: str) -> None:
-    """Print previous results for this quiz if they exist."""
-    all_results = load_results()
-    sessions = all_results.get(quiz_name)
-    if not sessions:
+    """Print a summary of this quiz's history and its last few rounds, if any."""
+    summary = analytics().quiz(quiz_name)
+    if summary is None:
         return
 
     print("\nPrevious sessions for this quiz:")
-    for s in sessions:
+    for line in format_summary(summary):
+        print(f"  {line}")
+    for s in results_store().recent(quiz_name, limit=3):
         print(
             f"  Round {s['round']}: "
             f"{s['correct_answers']}/{s['total_questions']} "
@@ -207,34 +234,51 @@ def show_previous_results(quiz_name: str) -> None:
 
 # ---------- Adaptive weighting ----------
 
-def build_question_pool(cards: List[Flashcard]) -> List[Flashcard]:
+# Scheduling state and card stats are saved per user of this machine
+CURRENT_USER = getpass.getuser()
+
+
+def build_scheduler(cards: DeckView, store: ScheduleStore) -> Scheduler:
     """
-    Build a pool of questions for a round.
+    Build the spaced-repetition scheduler for these cards.
 
-    - Each question appears at least once.
-    - Questions with more mistakes appear extra times (up to 3 extra),
-      which increases the chance they are asked again in this round.
+    - Cards missed in earlier sessions (or due for review) come first.
+    - Cards missed during a round are asked again a few questions later
+      (up to 3 extra times), instead of duplicating them in a pool.
     """
-    pool: List[Flashcard] = []
-    for card in cards:
-        copies = 1
-        if card.mistakes > 0:
-            copies += min(card.mistakes, 3)
-        pool.extend([card] * copies)
+    keys = [card_key(question, answer) for question, answer in cards.pairs]
+    return Scheduler(keys, store.load(CURRENT_USER, keys))
+
+
+def load_card_stats(cards: DeckView, keys: List[str], stats: CardStatsStore) -> None:
+    """Fill in times_seen / times_correct from earlier sessions as cards are asked."""
+    history = stats.load(CURRENT_USER, keys)
 
-    random.shuffle(pool)
-    return pool
+    def fill(index: int, card: Flashcard) -> None:
+        past = history.get(keys[index])
+        if past is not None:
+            card.times_seen = past.times_seen
+            card.times_correct = past.times_correct
+
+    cards.set_prepare(fill)
 
 
 # ---------- Quiz session with 80% rule & adaptive practice ----------
 
-def run_quiz_session(cards: List[Flashcard], quiz_name: str) -> None:
+def run_quiz_session(cards: Sequence[Flashcard], quiz_name: str) -> None:
     if not cards:
         print("No questions available. Exiting.")
         return
+    if not isinstance(cards, DeckView):
+        cards = DeckView.from_cards(cards)
 
     show_previous_results(quiz_name)
 
+    store = ScheduleStore()
+    scheduler = build_scheduler(cards, store)
+    stats = CardStatsStore()
+    load_card_stats(cards, scheduler.keys, stats)
+    answers = PreparedDeck(cards.pairs)
     round_number = 1
 
     while True:
@@ -242,13 +286,18 @@ def run_quiz_session(cards: List[Flashcard], quiz_name: str) -> None:
         print(f"        QUIZ ROUND {round_number}")
         print("==============================")
 
-        pool = build_question_pool(cards)
+        scheduler.start_round()
 
         total_asked = 0
         correct_this_round = 0
         incorrect_details = []
 
-        for card in pool:
+        while True:
+            idx = scheduler.next_card()
+            if idx is None:
+                break
+            card = cards[idx]
+
             print(f"\nQuestion: {card.question}")
             user_answer = input("Your answer (or type 'quit' to stop): ").strip()
 
@@ -261,15 +310,26 @@ def run_quiz_session(cards: List[Flashcard], quiz_name: str) -> None:
 
             card.times_seen += 1
             total_asked += 1
+            correct = answers.check(idx, user_answer)
+            stats.record(CURRENT_USER, scheduler.keys[idx], correct)
+            analytics().record_answer(quiz_name, scheduler.keys[idx], card.question, correct)
 
-            if user_answer.strip().lower() == card.answer.strip().lower():
+            if correct:
                 print("✅ Correct!")
                 card.times_correct += 1
                 correct_this_round += 1
+                scheduler.review(idx, True)
             else:
                 print("❌ Incorrect.")
                 print(f"   Correct answer: {card.answer}")
                 incorrect_details.append((card, user_answer))
+                scheduler.review(idx, False)
+                scheduler.requeue(idx)
+
+        # Remember due times so the next session starts with the weak cards
+        store.save(CURRENT_USER, scheduler.take_reviewed())
+        stats.flush()
+        analytics().flush()
 
         if total_asked == 0:
             print("No questions were answered. Goodbye!")
@@ -317,6 +377,40 @@ def run_quiz_session(cards: List[Flashcard], quiz_name: str) -> None:
         round_number += 1
 
 
+# ---------- Search ----------
+
+_search_index = None
+
+
+def search_index() -> SearchIndex:
+    """Index over every web set plus questions.txt and the manual log."""
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex(folder_files(SETS_FOLDER, [
+            ("questions.txt", os.path.join(BASE_DIR, "questions.txt")),
+            ("manual_questions_log.txt", MANUAL_LOG_FILE),
+        ]))
+    return _search_index
+
+
+def search_questions() -> None:
+    """Look up questions by keyword until the user enters a blank search."""
+    print("\n--- Search Questions ---")
+    while True:
+        query = input("Search for (or press Enter to go back): ").strip()
+        if not query:
+            return
+
+        hits = search_index().search(query, limit=20)
+        if not hits:
+            print("No matching questions.\n")
+            continue
+        for hit in hits:
+            print(f"[{hit.source}] {hit.question}")
+            print(f"    Answer: {hit.answer}")
+        print()
+
+
 # ---------- Main with Start Menu ----------
 
 def main():
@@ -330,12 +424,17 @@ def main():
         print("1) Start")
         print("2) Instructions")
         print("3) Quit")
-        start_choice = input("Select an option (1-3): ").strip()
+        print("4) Search questions")
+        start_choice = input("Select an option (1-4): ").strip()
 
         if start_choice == "3":
             print("Goodbye!")
             return
 
+        elif start_choice == "4":
+            search_questions()
+            continue
+
         elif start_choice == "2":
             print("\n--- Instructions ---")
             print("This tool allows you to practice questions in three ways:\n")
@@ -375,7 +474,7 @@ def main():
             # Go back to the start menu
             return main()
 
-        cards: List[Flashcard] = []
+        cards: Sequence[Flashcard] = []
 
         if choice == "1":
             path = os.path.join(BASE_DIR, "questions.txt")
@@ -0,0 +1,176 @@
+"""
+Server-side storage for in-progress quiz state.
+
+The Flask session cookie only carries a quiz id; everything else (which set,
+the shuffled order of card indices, score, missed cards) lives in one of
+these stores. Cards themselves are never copied into the state - the state
+refers to them by index into the cached set.
+
+Stores:
+- MemoryQuizStore: a dict in this process (default, good for development)
+- SQLiteQuizStore: a table in a SQLite file, shared by every process on the box
+
+Use create_store("memory") or create_store("sqlite:///path/to/quiz_state.db").
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# Quizzes untouched for this long are treated as abandoned and removed
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+class QuizStore:
+    """Interface every quiz-state backend implements."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+
+    def create(self, state: Dict[str, Any]) -> str:
+        """Store a new quiz and return its id."""
+        quiz_id = uuid.uuid4().hex
+        self.save(quiz_id, state)
+        return quiz_id
+
+    def get(self, quiz_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, quiz_id: str, state: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, quiz_id: str) -> None:
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Remove abandoned quizzes; returns how many were removed."""
+        raise NotImplementedError
+
+
+class MemoryQuizStore(QuizStore):
+    """Keeps quiz state in a dict. Only valid for a single process."""
+
+    # Run an expiry sweep every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl)
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, quiz_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._data.get(quiz_id)
+            if state is None:
+                return None
+            if time.time() - self._touched[quiz_id] > self.ttl:
+                self._data.pop(quiz_id, None)
+                self._touched.pop(quiz_id, None)
+                return None
+            return state
+
+    def save(self, quiz_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[quiz_id] = state
+            self._touched[quiz_id] = time.time()
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, quiz_id: str) -> None:
+        with self._lock:
+            self._data.pop(quiz_id, None)
+            self._touched.pop(quiz_id, None)
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [qid for qid, t in self._touched.items() if t < cutoff]
+            for qid in expired:
+                self._data.pop(qid, None)
+                self._touched.pop(qid, None)
+        return len(expired)
+
+
+class SQLiteQuizStore(QuizStore):
+    """Keeps quiz state as JSON rows in a SQLite database."""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL_SECONDS):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_state ("
+            " quiz_id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS quiz_state_updated ON quiz_state(updated_at)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections can't be shared freely
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, quiz_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT state, updated_at FROM quiz_state WHERE quiz_id = ?", (quiz_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def save(self, quiz_id: str, state: Dict[str, Any]) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO quiz_state (quiz_id, state, updated_at) VALUES (?, ?, ?)",
+            (quiz_id, json.dumps(state, separators=(",", ":")), time.time()),
+        )
+        conn.commit()
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, quiz_id: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM quiz_state WHERE quiz_id = ?", (quiz_id,))
+        conn.commit()
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        cur = conn.execute(
+            "DELETE FROM quiz_state WHERE updated_at < ?", (time.time() - self.ttl,)
+        )
+        conn.commit()
+        return cur.rowcount
+
+
+def create_store(url: str) -> QuizStore:
+    """
+    Build a store from a config string:
+      "memory"                   -> MemoryQuizStore
+      "sqlite:///path/to/file"   -> SQLiteQuizStore
+    """
+    if url == "memory":
+        return MemoryQuizStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteQuizStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown quiz store: {url!r}")
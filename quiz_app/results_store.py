@@ -0,0 +1,198 @@
+"""
+Storage for quiz round results.
+
+Each finished round is one appended row in SQLite, indexed by quiz name, so
+recording a round no longer rewrites the whole history and reading one
+quiz's history doesn't load everyone else's. The database runs in WAL mode
+with synchronous=FULL, so a committed round survives a crash, and several
+processes can record results at the same time.
+
+The old quiz_results.json is imported on first use and then left untouched.
+
+Each round also updates its quiz's running summary (see analytics.py) in the
+same transaction, so summaries never disagree with the raw rounds.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from . import analytics
+    from .scheduler import DEFAULT_DB
+except ImportError:  # running as a script
+    import analytics
+    from scheduler import DEFAULT_DB
+
+log = logging.getLogger(__name__)
+
+
+class ResultsStore:
+    """Append-only round results, looked up by quiz name."""
+
+    def __init__(self, path: str = DEFAULT_DB, legacy_json: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_results ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " quiz_name TEXT NOT NULL,"
+            " round INTEGER NOT NULL,"
+            " total_questions INTEGER NOT NULL,"
+            " correct_answers INTEGER NOT NULL,"
+            " score_percent REAL NOT NULL,"
+            " recorded_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS quiz_results_name ON quiz_results(quiz_name, id)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        analytics.create_tables(conn)
+        conn.commit()
+        analytics.backfill(conn)
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import a quiz_results.json file once. Returns the number of rounds
+        imported (0 if it was already imported or doesn't exist).
+
+        The file should map quiz names to lists of round objects. Anything
+        else (a truncated or hand-edited file) is skipped with a warning,
+        and the file is still marked as imported.
+        """
+        marker = "migrated:" + os.path.abspath(json_path)
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM store_meta WHERE key = ?", (marker,)).fetchone():
+            return 0
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (ValueError, OSError) as e:
+            log.warning("%s: not imported, can't read it (%s)", json_path, e)
+            legacy = {}
+        if not isinstance(legacy, dict):
+            log.warning("%s: not imported, expected an object of quiz names", json_path)
+            legacy = {}
+
+        rows = []
+        skipped = 0
+        mtime = os.path.getmtime(json_path)
+        for quiz_name, sessions in legacy.items():
+            if not isinstance(sessions, list):
+                log.warning("%s: skipped %r, expected a list of rounds", json_path, quiz_name)
+                continue
+            for s in sessions:
+                try:
+                    rows.append((
+                        str(quiz_name), int(s["round"]), int(s["total_questions"]),
+                        int(s["correct_answers"]), float(s["score_percent"]), mtime,
+                    ))
+                except (TypeError, KeyError, ValueError):
+                    skipped += 1
+        if skipped:
+            log.warning("%s: skipped %d malformed round(s)", json_path, skipped)
+
+        # Rows and the marker go in one transaction: a second process
+        # migrating at the same time fails the marker insert and rolls back
+        try:
+            with conn:
+                conn.execute("INSERT INTO store_meta (key, value) VALUES (?, ?)",
+                             (marker, str(time.time())))
+                conn.executemany(
+                    "INSERT INTO quiz_results (quiz_name, round, total_questions,"
+                    " correct_answers, score_percent, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                for row in rows:
+                    analytics.add_round(conn, *row)
+        except sqlite3.IntegrityError:
+            return 0
+        return len(rows)
+
+    def append(self, quiz_name: str, round_number: int, total_questions: int,
+               correct_answers: int, score_percent: float, passed: Optional[bool] = None) -> None:
+        """
+        Record a round. passed says whether this round passed the quiz
+        (default: score_percent >= analytics.PASS_PERCENT).
+        """
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO quiz_results (quiz_name, round, total_questions,"
+                " correct_answers, score_percent, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (quiz_name, round_number, total_questions, correct_answers,
+                 score_percent, now),
+            )
+            analytics.add_round(conn, quiz_name, round_number, total_questions,
+                                correct_answers, score_percent, now, passed)
+
+    def recent(self, quiz_name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """The last few rounds of one quiz, oldest first."""
+        rows = self._conn().execute(
+            "SELECT round, total_questions, correct_answers, score_percent"
+            " FROM quiz_results WHERE quiz_name = ? ORDER BY id DESC LIMIT ?",
+            (quiz_name, limit),
+        ).fetchall()
+        return [
+            {
+                "round": r,
+                "total_questions": total,
+                "correct_answers": correct,
+                "score_percent": percent,
+            }
+            for r, total, correct, percent in reversed(rows)
+        ]
+
+    def sessions(self, quiz_name: str) -> List[Dict[str, Any]]:
+        """All rounds recorded for one quiz, oldest first."""
+        rows = self._conn().execute(
+            "SELECT round, total_questions, correct_answers, score_percent"
+            " FROM quiz_results WHERE quiz_name = ? ORDER BY id",
+            (quiz_name,),
+        )
+        return [
+            {
+                "round": r,
+                "total_questions": total,
+                "correct_answers": correct,
+                "score_percent": percent,
+            }
+            for r, total, correct, percent in rows
+        ]
+
+    def all_results(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Every quiz's history, in the shape quiz_results.json used."""
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        rows = self._conn().execute(
+            "SELECT quiz_name, round, total_questions, correct_answers, score_percent"
+            " FROM quiz_results ORDER BY id"
+        )
+        for name, r, total, correct, percent in rows:
+            results.setdefault(name, []).append({
+                "round": r,
+                "total_questions": total,
+                "correct_answers": correct,
+                "score_percent": percent,
+            })
+        return results
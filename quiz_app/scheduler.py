@@ -0,0 +1,278 @@
+"""
+Leitner-style spaced-repetition scheduler.
+
+Every card a user has practiced has a box (0-5) and a due time:
+
+- A correct answer moves the card up one box and schedules it further out
+  (see BOX_INTERVALS).
+- A wrong answer drops it back to box 0, due immediately.
+
+Within a quiz, cards are kept in a heap ordered by priority, so picking the
+next card costs O(log n) and missed cards can be requeued a few questions
+later without copying the deck. Card state is saved in SQLite (ScheduleStore)
+keyed by user and card_key(), so scheduling survives restarts. The web app
+buffers the states each answer changes and writes them in batches, like
+card_stats.py.
+"""
+
+import atexit
+import hashlib
+import heapq
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# SQLite file shared by the scheduler and the other per-user stores
+DEFAULT_DB = os.environ.get(
+    "QUIZ_DATA_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_data.db")
+)
+
+# When buffered writes (here, in card_stats.py and analytics.py) are flushed
+FLUSH_EVERY = 200       # buffered answers
+FLUSH_SECONDS = 5.0     # oldest buffered answer
+
+DAY = 24 * 60 * 60
+
+# Seconds until a card in each box is due again
+BOX_INTERVALS = [0, 1 * DAY, 3 * DAY, 7 * DAY, 14 * DAY, 30 * DAY]
+
+# A missed card comes back after this many other questions in the same round...
+REQUEUE_GAP = 3
+# ...at most this many extra times per round
+MAX_REQUEUES = 3
+
+
+def card_key(question: str, answer: str) -> str:
+    """Stable id for a card, independent of which set or file it came from."""
+    text = question.strip().lower() + "\x1f" + answer.strip().lower()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CardState:
+    """Where a card is in the Leitner system for one user."""
+
+    __slots__ = ("box", "due")
+
+    def __init__(self, box: int = 0, due: float = 0.0):
+        self.box = box
+        self.due = due
+
+    def review(self, correct: bool, now: float) -> None:
+        if correct:
+            self.box = min(self.box + 1, len(BOX_INTERVALS) - 1)
+        else:
+            self.box = 0
+        self.due = now + BOX_INTERVALS[self.box]
+
+
+class ScheduleStore:
+    """
+    Card states per (user, card_key), stored in SQLite.
+
+    save() writes at once; record() buffers states and writes them on the
+    next flush (FLUSH_EVERY states, FLUSH_SECONDS, or exit). Reads include
+    buffered states. A buffered state is only visible to this process until
+    it is flushed, and the newest flush of a card wins.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], CardState] = {}
+        self._oldest = 0.0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS card_schedule ("
+            " user TEXT NOT NULL,"
+            " card_key TEXT NOT NULL,"
+            " box INTEGER NOT NULL,"
+            " due REAL NOT NULL,"
+            " PRIMARY KEY (user, card_key))"
+        )
+        conn.commit()
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, user: str, keys: Iterable[str]) -> Dict[str, CardState]:
+        """States for the given cards; cards never seen are left out."""
+        keys = list(keys)
+        states: Dict[str, CardState] = {}
+        conn = self._conn()
+        # Stay under SQLite's limit on query parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT card_key, box, due FROM card_schedule"
+                f" WHERE user = ? AND card_key IN ({marks})",
+                [user] + chunk,
+            )
+            for key, box, due in rows:
+                states[key] = CardState(box, due)
+        with self._lock:
+            for key in keys:
+                s = self._pending.get((user, key))
+                if s is not None:
+                    states[key] = CardState(s.box, s.due)
+        return states
+
+    def user_states(self, user: str) -> Dict[str, CardState]:
+        """Every card the user has practiced, in any set."""
+        rows = self._conn().execute(
+            "SELECT card_key, box, due FROM card_schedule WHERE user = ?", (user,)
+        )
+        states = {key: CardState(box, due) for key, box, due in rows}
+        with self._lock:
+            for (pending_user, key), s in self._pending.items():
+                if pending_user == user:
+                    states[key] = CardState(s.box, s.due)
+        return states
+
+    def record(self, user: str, states: Dict[str, CardState]) -> None:
+        """Buffer changed states (e.g. one answer's). Written on the next flush."""
+        if not states:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._pending:
+                self._oldest = now
+            for key, s in states.items():
+                self._pending[(user, key)] = CardState(s.box, s.due)
+            due = len(self._pending) >= FLUSH_EVERY or now - self._oldest >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered states in one transaction. Returns rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO card_schedule (user, card_key, box, due) VALUES (?, ?, ?, ?)",
+            [(user, key, s.box, s.due) for (user, key), s in pending.items()],
+        )
+        conn.commit()
+        return len(pending)
+
+    def save(self, user: str, states: Dict[str, CardState]) -> None:
+        if not states:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO card_schedule (user, card_key, box, due) VALUES (?, ?, ?, ?)",
+            [(user, key, s.box, s.due) for key, s in states.items()],
+        )
+        conn.commit()
+
+
+class Scheduler:
+    """
+    Picks cards for one round of a quiz.
+
+    Cards start with the weakest due cards first (see order()).
+    next_card() pops the heap; a missed card can be pushed back with
+    requeue() so it is asked again a few questions later.
+    """
+
+    def __init__(self, keys: Sequence[str], states: Dict[str, CardState],
+                 rng: Optional[random.Random] = None):
+        self.keys = keys
+        self.states = states
+        self.rng = rng or random.Random()
+        self.asked = 0
+        self.reviewed: Dict[str, CardState] = {}
+        self._requeues: Dict[int, int] = {}
+        self._heap: List[Tuple[float, float, int]] = []
+
+    def state(self, idx: int) -> CardState:
+        key = self.keys[idx]
+        s = self.states.get(key)
+        if s is None:
+            s = self.states[key] = CardState()
+        return s
+
+    def start_round(self, indices: Optional[Iterable[int]] = None) -> None:
+        """Queue every card (or just `indices`) in order()."""
+        if indices is None:
+            indices = range(len(self.keys))
+        ranked = self.order(indices)
+        # Priority is the position in the round; heapify is O(n)
+        self._heap = [(float(pos), 0.0, idx) for pos, idx in enumerate(ranked)]
+        heapq.heapify(self._heap)
+        self.asked = 0
+        self._requeues = {}
+
+    def order(self, indices: Iterable[int], now: Optional[float] = None) -> List[int]:
+        """
+        Indices in the order they should be asked, ties shuffled:
+          1. cards already practiced and now due, lowest box (weakest) first
+          2. cards never practiced
+          3. cards not due yet, soonest first
+        """
+        now = time.time() if now is None else now
+        heap = []
+        for i in indices:
+            s = self.states.get(self.keys[i])
+            if s is None:
+                rank = (1, 0, 0.0)
+            elif s.due <= now:
+                rank = (0, s.box, s.due)
+            else:
+                rank = (2, s.box, s.due)
+            heap.append((rank, self.rng.random(), i))
+        heapq.heapify(heap)
+        return [heapq.heappop(heap)[-1] for _ in range(len(heap))]
+
+    def split_practiced(self, indices: Iterable[int],
+                        now: Optional[float] = None) -> Tuple[List[int], List[int]]:
+        """
+        order() of cards the user has practiced, split into (due now, not due
+        yet). Whatever is left of a deck goes between the two.
+        """
+        now = time.time() if now is None else now
+        ranked = self.order(indices, now)
+        split = sum(1 for i in ranked if self.states[self.keys[i]].due <= now)
+        return ranked[:split], ranked[split:]
+
+    def next_card(self) -> Optional[int]:
+        """Index of the next card to ask, or None when the round is over."""
+        if not self._heap:
+            return None
+        self.asked += 1
+        return heapq.heappop(self._heap)[2]
+
+    def review(self, idx: int, correct: bool, now: Optional[float] = None) -> CardState:
+        s = self.state(idx)
+        s.review(correct, time.time() if now is None else now)
+        self.reviewed[self.keys[idx]] = s
+        return s
+
+    def take_reviewed(self) -> Dict[str, CardState]:
+        """States changed since the last call (what needs saving)."""
+        reviewed, self.reviewed = self.reviewed, {}
+        return reviewed
+
+    def requeue(self, idx: int) -> bool:
+        """Ask a missed card again later this round (limited per card)."""
+        count = self._requeues.get(idx, 0)
+        if count >= MAX_REQUEUES:
+            return False
+        self._requeues[idx] = count + 1
+        heapq.heappush(self._heap, (self.asked + REQUEUE_GAP - 0.5, self.rng.random(), idx))
+        return True
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,198 @@
+"""
+Full-text search over every question set.
+
+SearchIndex keeps an inverted index (word -> set file -> card numbers) over
+the question and answer text of a list of files. Before each search it
+checks the files' signatures and re-indexes only the files that changed,
+were added or were removed, so searching stays fast without ever rebuilding
+the whole index.
+
+Words are normalized the same way answers are graded (grading.normalize),
+so "Café", "cafe" and "CAFE" all match. A query matches cards containing
+every query word; the last word also matches as a prefix ("photo" finds
+"photosynthesis").
+"""
+
+import bisect
+import os
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from .grading import normalize
+    from .preparsed import set_signature
+    from .set_cache import load_set
+except ImportError:  # running as a script
+    from grading import normalize
+    from preparsed import set_signature
+    from set_cache import load_set
+
+
+class SearchHit(NamedTuple):
+    source: str      # set name / file label
+    path: str
+    index: int       # card number within the file
+    question: str
+    answer: str
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize(text).split()
+
+
+class SearchIndex:
+    """
+    Incrementally maintained inverted index.
+
+    list_files returns the (label, path) pairs that should be searchable; it
+    is called on every refresh so new or deleted sets are noticed.
+    """
+
+    def __init__(self, list_files: Callable[[], Iterable[Tuple[str, str]]]):
+        self.list_files = list_files
+        self._lock = threading.Lock()
+        self._files: Dict[str, Tuple[str, Tuple[int, ...]]] = {}   # path -> (label, signature)
+        self._file_words: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Dict[str, array]] = {}           # word -> path -> card numbers
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self.reindexed = 0
+
+    def refresh(self) -> int:
+        """Re-index changed files. Returns how many files were (re)indexed."""
+        wanted: Dict[str, str] = {}
+        for label, path in self.list_files():
+            wanted[os.path.abspath(path)] = label
+
+        changed = 0
+        with self._lock:
+            for path in list(self._files):
+                if path not in wanted:
+                    self._remove(path)
+                    changed += 1
+
+            for path, label in wanted.items():
+                try:
+                    signature = set_signature(path)
+                except FileNotFoundError:
+                    if path in self._files:
+                        self._remove(path)
+                        changed += 1
+                    continue
+                known = self._files.get(path)
+                if known is not None and known[1] == signature:
+                    continue
+                if known is not None:
+                    self._remove(path)
+                self._add(path, label, signature)
+                changed += 1
+
+            self.reindexed += changed
+        return changed
+
+    def search(self, query: str, limit: int = 50) -> List[SearchHit]:
+        """Cards containing every word of the query (last word as a prefix)."""
+        self.refresh()
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            per_word: List[Dict[str, Set[int]]] = []
+            for word in words[:-1]:
+                per_word.append({p: set(ids) for p, ids in self._postings.get(word, {}).items()})
+            per_word.append(self._prefix_matches(words[-1]))
+
+            # Intersect starting with the rarest word
+            per_word.sort(key=lambda m: sum(len(ids) for ids in m.values()))
+            matches = per_word[0]
+            for other in per_word[1:]:
+                matches = {
+                    path: ids & other[path]
+                    for path, ids in matches.items()
+                    if path in other and ids & other[path]
+                }
+                if not matches:
+                    return []
+
+            labels = {path: self._files[path][0] for path in matches}
+
+        hits: List[SearchHit] = []
+        for path in sorted(matches, key=lambda p: labels[p].lower()):
+            cards = load_set(path).cards
+            for idx in sorted(matches[path]):
+                if idx >= len(cards):
+                    continue
+                question, answer = cards[idx]
+                hits.append(SearchHit(labels[path], path, idx, question, answer))
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "words": len(self._postings),
+                "reindexed": self.reindexed,
+            }
+
+    # ---------- Internals (called with the lock held) ----------
+
+    def _add(self, path: str, label: str, signature: Tuple[int, ...]) -> None:
+        try:
+            cards = load_set(path).cards
+        except (OSError, ValueError):
+            cards = ()
+        words: Dict[str, array] = {}
+        for idx, (question, answer) in enumerate(cards):
+            for word in set(tokenize(question) + tokenize(answer)):
+                ids = words.get(word)
+                if ids is None:
+                    ids = words[word] = array("I")
+                ids.append(idx)
+        for word, ids in words.items():
+            self._postings.setdefault(word, {})[path] = ids
+        self._files[path] = (label, signature)
+        self._file_words[path] = set(words)
+        self._vocabulary_dirty = True
+
+    def _remove(self, path: str) -> None:
+        for word in self._file_words.pop(path, ()):
+            files = self._postings.get(word)
+            if files is None:
+                continue
+            files.pop(path, None)
+            if not files:
+                del self._postings[word]
+        self._files.pop(path, None)
+        self._vocabulary_dirty = True
+
+    def _prefix_matches(self, prefix: str) -> Dict[str, Set[int]]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        result: Dict[str, Set[int]] = {}
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            for path, ids in self._postings[word].items():
+                result.setdefault(path, set()).update(ids)
+        return result
+
+
+def folder_files(folder: str, extra: Optional[Iterable[Tuple[str, str]]] = None):
+    """A list_files callable for every .txt/.json set in a folder plus extra files."""
+    extra = list(extra or [])
+
+    def list_files() -> List[Tuple[str, str]]:
+        files = []
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if not name.startswith(".") and name.endswith((".txt", ".json")):
+                    files.append((os.path.splitext(name)[0], os.path.join(folder, name)))
+        return files + extra
+
+    return list_files
@@ -0,0 +1,386 @@
+"""
+Shared in-process cache of parsed flashcard sets.
+
+Both the Flask app (app.py) and the command-line tool (quiz_app.py) read
+question sets through this module, so a set is only parsed again when the
+file on disk actually changes.
+
+- Entries are keyed by absolute path.
+- An entry is reused only while the file's mtime and size are unchanged
+  (for JSON sets, the mtime and size of its journal too - see journal.py).
+- Sets with an up-to-date binary copy (see preparsed.py) are served from
+  that memory-mapped deck instead of being parsed at all.
+- Parsed cards are stored packed (see cards.PackedCards) rather than as
+  one tuple per card.
+- The cache is an LRU bounded by an approximate memory budget. The most
+  recent set that is bigger than the whole budget is kept outside it, so
+  loading it again doesn't re-parse it.
+- A set is parsed by one thread at a time: concurrent requests for it (and
+  refresh() calls from the file watcher, see watcher.py) wait for that one
+  parse instead of starting their own.
+- Hit / miss / eviction counters are available through stats().
+"""
+
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .cards import PackedCards
+    from .journal import last_seq, read_journal
+    from .parser import iter_file_cards
+    from .preparsed import (
+        read_preparsed, read_preparsed_meta, set_signature, write_preparsed, write_preparsed_meta,
+    )
+except ImportError:  # running as a script
+    from cards import PackedCards
+    from journal import last_seq, read_journal
+    from parser import iter_file_cards
+    from preparsed import (
+        read_preparsed, read_preparsed_meta, set_signature, write_preparsed, write_preparsed_meta,
+    )
+
+# A parsed card is an immutable (question, answer) pair. Callers build their
+# own Flashcards from these (cards.DeckView) so cached data is never mutated.
+Card = Tuple[str, str]
+
+# Cost charged against the budget for a memory-mapped deck; its pages belong
+# to the OS page cache rather than the Python heap
+MAPPED_DECK_BYTES = 4096
+
+# Default memory budget for all cached sets (can be overridden by env var)
+DEFAULT_MAX_BYTES = int(os.environ.get("SET_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+class ParsedSet:
+    """The parsed contents of one set file plus the file signature it came from."""
+
+    __slots__ = ("path", "cards", "meta", "signature", "size_estimate", "_derived")
+
+    def __init__(self, path: str, cards: Sequence[Card], meta: Dict[str, Any],
+                 signature: Tuple[int, ...]):
+        self.path = path
+        self.cards = cards
+        self.meta = meta
+        self.signature = signature
+        self.size_estimate = _estimate_size(cards)
+        self._derived: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def derived(self, name: str, build: Callable[[Sequence[Card]], Any]) -> Any:
+        """
+        Memoize a value computed from the cards (e.g. card keys). It lives as
+        long as this parsed set, so it is rebuilt whenever the file changes.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = build(self.cards)
+        return value
+
+
+def _estimate_size(cards: Sequence[Card]) -> int:
+    """Rough number of bytes held by a set's cards."""
+    if isinstance(cards, PackedCards):
+        return cards.nbytes()
+    if not isinstance(cards, tuple):
+        return MAPPED_DECK_BYTES
+    total = sys.getsizeof(cards)
+    for question, answer in cards:
+        total += 56 + sys.getsizeof(question) + sys.getsizeof(answer)
+    return total
+
+
+# ---------- Parsers ----------
+
+def parse_txt(path: str) -> Tuple[PackedCards, Dict[str, Any]]:
+    """Parse the plain text format (see parser.py) line by line."""
+    cards = PackedCards.from_pairs((card.question, card.answer) for card in iter_file_cards(path))
+    return cards, {}
+
+
+def _split_json(data: Any) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Separate a JSON set into its card objects and its settings. Per-card
+    "aliases" lists are collected into meta["aliases"] keyed by card index.
+    """
+    meta: Dict[str, Any] = {}
+    if isinstance(data, dict):
+        meta = {k: v for k, v in data.items() if k != "questions"}
+        data = data.get("questions", [])
+
+    items = [item for item in data if isinstance(item, dict)]
+    aliases = {
+        i: [str(a) for a in item["aliases"]]
+        for i, item in enumerate(items)
+        if item.get("aliases")
+    }
+    if aliases:
+        meta["aliases"] = aliases
+    return items, meta
+
+
+def parse_json(path: str) -> Tuple[PackedCards, Dict[str, Any]]:
+    """
+    Parse a JSON set. Both shapes used in flashcard_sets/ are accepted:
+      - a plain list of {"question": ..., "answer": ...}
+      - {"questions": [...], ...other settings...}
+    Settings include "strictness" for grading; cards may list "aliases".
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    items, meta = _split_json(data)
+    cards = [
+        (str(item.get("question", "")), str(item.get("answer", "")))
+        for item in items
+    ]
+
+    # Replay cards added since the last compaction; meta["journal_seq"] ends
+    # up as the last sequence number included in the cards
+    for entry in read_journal(path, after_seq=int(meta.get("journal_seq", 0))):
+        cards.append((str(entry.get("question", "")), str(entry.get("answer", ""))))
+        meta["journal_seq"] = entry["seq"]
+
+    return PackedCards.from_pairs(cards), meta
+
+
+def parse_source(path: str) -> Tuple[PackedCards, Dict[str, Any]]:
+    """Pick a parser from the file extension (anything not .json is text)."""
+    if path.endswith(".json"):
+        return parse_json(path)
+    return parse_txt(path)
+
+
+def parse_set_file(path: str, signature: Tuple[int, ...]) -> Tuple[Sequence[Card], Dict[str, Any]]:
+    """Use the binary deck copy when it matches signature, else parse the source."""
+    deck = read_preparsed(path, signature)
+    if deck is None:
+        return parse_source(path)
+    if not path.endswith(".json"):
+        return deck, {}
+    # Settings kept next to the questions are not stored in the deck but
+    # saved beside it; read the source only if those are missing or stale
+    meta = read_preparsed_meta(path, signature)
+    if meta is None:
+        meta = parse_json_meta(path)
+        meta["journal_seq"] = last_seq(path)
+        try:
+            write_preparsed_meta(path, meta, signature)
+        except OSError:
+            pass
+    return deck, meta
+
+
+def parse_json_meta(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return _split_json(data)[1]
+
+
+def convert_to_deck(path: str) -> Tuple[str, int]:
+    """Write (or refresh) the binary deck copy of a set from its source."""
+    signature = set_signature(path)
+    cards, meta = parse_source(path)
+    return write_preparsed(path, cards, signature, meta), len(cards)
+
+
+# ---------- Cache ----------
+
+class ParsedSetCache:
+    """Thread-safe LRU cache of ParsedSet objects with mtime/size invalidation."""
+
+    # What each stats() value means (HELP lines at /metrics); STATS_GAUGES
+    # are current sizes, the rest only ever go up
+    STATS_HELP = {
+        "hits": "Set loads served from the parsed-set cache.",
+        "misses": "Set loads that found no up-to-date cached copy.",
+        "evictions": "Cached sets evicted to stay within the memory budget.",
+        "invalidations": "Cached sets dropped because their file changed or was written.",
+        "coalesced": "Set loads that waited for another thread's parse instead of parsing.",
+        "refreshes": "Sets re-parsed ahead of time after a change on disk.",
+        "oversized": "Parsed sets larger than the whole memory budget.",
+        "entries": "Sets currently cached.",
+        "bytes": "Approximate memory held by cached sets.",
+        "max_bytes": "Memory budget of the parsed-set cache.",
+    }
+    STATS_GAUGES = ("entries", "bytes", "max_bytes")
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ParsedSet]" = OrderedDict()
+        self._bytes = 0
+        # Most recent set too big for the budget (not counted in _bytes)
+        self._oversized: Optional[ParsedSet] = None
+        self._lock = threading.Lock()
+        # One lock per path, held while that set is being parsed
+        self._parse_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.oversized = 0
+
+    def get(self, path: str) -> ParsedSet:
+        """
+        Return the parsed set for path, parsing it only if it is not cached
+        or the file changed since it was cached.
+
+        Raises FileNotFoundError if the file does not exist.
+        """
+        key = os.path.abspath(path)
+        signature = set_signature(key)
+
+        entry = self._lookup(key, signature)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+
+        # Parse outside the cache lock so one large set doesn't block other
+        # readers, but only once per set however many threads want it
+        with self._parse_lock(key):
+            signature = set_signature(key)
+            entry = self._lookup(key, signature)
+            if entry is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return entry
+            return self._parse(key, signature)
+
+    def refresh(self, path: str) -> bool:
+        """
+        Re-parse a set now if it changed since it was cached (or isn't cached),
+        so the next request finds it ready, and save its .deck copy so other
+        processes can load it without parsing. Returns True if it was parsed.
+        """
+        key = os.path.abspath(path)
+        with self._parse_lock(key):
+            try:
+                signature = set_signature(key)
+            except FileNotFoundError:
+                self.invalidate(key)
+                return False
+            if self._lookup(key, signature) is not None:
+                return False
+            entry = self._parse(key, signature)
+            with self._lock:
+                self.refreshes += 1
+        if isinstance(entry.cards, PackedCards):
+            try:
+                write_preparsed(key, entry.cards, signature, entry.meta)
+            except OSError:
+                pass  # they will parse the source instead
+        return True
+
+    def _lookup(self, key: str, signature: Tuple[int, ...]) -> Optional[ParsedSet]:
+        """The cached entry if it matches signature; a stale one is dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._oversized is not None and self._oversized.path == key:
+                entry = self._oversized
+            if entry is None:
+                return None
+            if entry.signature == signature:
+                if entry is not self._oversized:
+                    self._entries.move_to_end(key)
+                return entry
+            # File changed on disk: drop the stale entry
+            self._remove(key)
+            self.invalidations += 1
+            return None
+
+    def _parse(self, key: str, signature: Tuple[int, ...]) -> ParsedSet:
+        cards, meta = parse_set_file(key, signature)
+        entry = ParsedSet(key, cards, meta, signature)
+        self._store(entry)
+        return entry
+
+    def _parse_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._parse_locks.get(key)
+            if lock is None:
+                lock = self._parse_locks[key] = threading.Lock()
+            return lock
+
+    def invalidate(self, path: str) -> None:
+        """Forget a cached set (e.g. right after writing it)."""
+        key = os.path.abspath(path)
+        with self._lock:
+            if key in self._entries or (self._oversized is not None and self._oversized.path == key):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._oversized = None
+            for key in list(self._parse_locks):
+                self._drop_parse_lock(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring how well the cache is doing."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "oversized": self.oversized,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _store(self, entry: ParsedSet) -> None:
+        with self._lock:
+            if entry.path in self._entries:
+                self._remove(entry.path)
+            if entry.size_estimate > self.max_bytes:
+                # Bigger than the whole budget: keep it on the side, replacing
+                # the previous such set, rather than evicting everything else
+                if self._oversized is not None and self._oversized.path != entry.path:
+                    self._drop_parse_lock(self._oversized.path)
+                self._oversized = entry
+                self.oversized += 1
+                return
+            self._entries[entry.path] = entry
+            self._bytes += entry.size_estimate
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size_estimate
+        elif self._oversized is not None and self._oversized.path == key:
+            self._oversized = None
+        self._drop_parse_lock(key)
+
+    def _drop_parse_lock(self, key: str) -> None:
+        # Kept while a parse holds it, so waiting threads still coalesce
+        lock = self._parse_locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._parse_locks[key]
+
+
+# Process-wide cache shared by the web app and the CLI
+SET_CACHE = ParsedSetCache()
+
+
+def load_set(path: str) -> ParsedSet:
+    """Load a set through the shared cache."""
+    return SET_CACHE.get(path)
@@ -0,0 +1,155 @@
+"""
+Warm-up: pre-parse every set before the web app takes traffic.
+
+Without it, the first student to open each set after a deploy waits for the
+full parse. warm_up() parses every .txt/.json set in the sets folder with a
+pool of processes (one per core by default), checks that each one has
+questions, and writes its binary .deck copy (see preparsed.py). Workers
+then open sets through mmap instead of parsing them.
+
+Sets whose .deck copy is already up to date are skipped. serve.py runs this
+before starting its workers; it can also be run on its own:
+
+    python -m quiz_app.warmup flashcard_sets --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+try:
+    from .cards import PackedCards
+    from .parser import iter_file_cards
+    from .preparsed import read_preparsed, set_signature, write_preparsed
+    from .set_cache import parse_json
+except ImportError:  # running as a script
+    from cards import PackedCards
+    from parser import iter_file_cards
+    from preparsed import read_preparsed, set_signature, write_preparsed
+    from set_cache import parse_json
+
+
+class WarmedSet(NamedTuple):
+    path: str
+    status: str          # "parsed", "fresh" (deck already up to date) or "failed"
+    cards: int
+    rejected: int        # lines of a .txt set that were skipped
+    seconds: float
+    error: Optional[str] = None
+
+
+class WarmupReport(NamedTuple):
+    sets: List[WarmedSet]
+    workers: int
+    seconds: float
+
+    @property
+    def failures(self) -> List[WarmedSet]:
+        return [s for s in self.sets if s.status == "failed"]
+
+
+def set_files(folder: str) -> List[str]:
+    """Every .txt and .json set in folder (hidden files and folders left out)."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if not name.startswith(".") and name.endswith((".txt", ".json"))
+    )
+
+
+def warm_set(path: str) -> WarmedSet:
+    """Parse and validate one set and write its .deck copy. Runs in a pool process."""
+    start = time.perf_counter()
+    rejected = 0
+
+    def reject(_line) -> None:
+        nonlocal rejected
+        rejected += 1
+
+    try:
+        signature = set_signature(path)
+        meta = None
+        if path.endswith(".json"):
+            cards, meta = parse_json(path)
+        else:
+            cards = PackedCards.from_pairs(
+                (card.question, card.answer) for card in iter_file_cards(path, reject)
+            )
+        if not cards:
+            raise ValueError("no questions found")
+        write_preparsed(path, cards, signature, meta)
+    except Exception as e:
+        # Bad JSON, JSON of the wrong shape, an empty set...: report it and
+        # let the other sets (and startup) carry on
+        return WarmedSet(path, "failed", 0, rejected, time.perf_counter() - start, str(e))
+    return WarmedSet(path, "parsed", len(cards), rejected, time.perf_counter() - start)
+
+
+def warm_up(folder: str, workers: Optional[int] = None, force: bool = False) -> WarmupReport:
+    """
+    Pre-parse every set in folder that has no up-to-date .deck copy (all of
+    them with force), using up to `workers` processes.
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    results: List[WarmedSet] = []
+    todo: List[str] = []
+    for path in set_files(folder):
+        deck = None if force else read_preparsed(path)
+        if deck is not None:
+            results.append(WarmedSet(path, "fresh", len(deck), 0, 0.0))
+            deck.close()
+        else:
+            todo.append(path)
+
+    workers = max(1, min(workers, len(todo)))
+    if workers == 1:
+        results.extend(warm_set(path) for path in todo)
+    else:
+        # Large sets first, so one big set doesn't start last and hold up the rest
+        todo.sort(key=os.path.getsize, reverse=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results.extend(pool.map(warm_set, todo))
+
+    results.sort(key=lambda s: s.path)
+    return WarmupReport(results, workers, time.perf_counter() - start)
+
+
+def print_report(report: WarmupReport, out=sys.stderr, verbose: bool = True) -> None:
+    if verbose:
+        for s in report.sets:
+            name = os.path.basename(s.path)
+            if s.status == "failed":
+                print(f"  {name}: FAILED after {s.seconds * 1000:.1f}ms: {s.error}", file=out)
+            elif s.status == "fresh":
+                print(f"  {name}: up to date ({s.cards} cards)", file=out)
+            else:
+                skipped = f", {s.rejected} line(s) skipped" if s.rejected else ""
+                print(f"  {name}: {s.cards} cards in {s.seconds * 1000:.1f}ms{skipped}", file=out)
+    parsed = sum(1 for s in report.sets if s.status == "parsed")
+    print(
+        f"Warm-up: {parsed} set(s) parsed, {len(report.sets) - parsed - len(report.failures)} up to date, "
+        f"{len(report.failures)} failed in {report.seconds:.2f}s with {report.workers} process(es)",
+        file=out,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-parse every set so the first quiz is fast.")
+    parser.add_argument("folder", nargs="?", default="flashcard_sets", help="sets folder")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="re-parse sets that are up to date")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    report = warm_up(args.folder, args.workers, args.force)
+    print_report(report, sys.stdout, verbose=not args.quiet)
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Background watcher for set files edited outside the app.
+
+Instructors copy or edit files in flashcard_sets/ by hand, and the console
+app appends to quiz_app/manual_questions_log.txt. The set cache would notice
+such a change on the next request (the file's signature no longer matches)
+and that request would wait for the re-parse. The watcher notices first:
+
+- with watchdog installed (pip install watchdog), through the OS's file
+  events (inotify on Linux); otherwise by polling file signatures every
+  POLL_SECONDS
+- each changed set (or journal, for JSON sets) is handed to on_change once
+  it has been quiet for DEBOUNCE_SECONDS, from a background thread, so a
+  file copied in several writes is only re-parsed once
+
+app.py uses on_change to re-parse the set into the shared cache and update
+its catalog entry. A request that arrives while the re-parse is still
+running waits for it (see ParsedSetCache.get) rather than parsing again, so
+nobody gets a stale deck.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .catalog import is_set_file
+    from .journal import JOURNAL_DIR
+    from .preparsed import set_signature
+except ImportError:  # running as a script
+    from catalog import is_set_file
+    from journal import JOURNAL_DIR
+    from preparsed import set_signature
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling only
+    FileSystemEventHandler = object
+    Observer = None
+
+log = logging.getLogger(__name__)
+
+POLL_SECONDS = 2.0
+DEBOUNCE_SECONDS = 0.2
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "SetWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event) -> None:
+        # Opening or reading a set (as every request does) changes nothing
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.notify(os.fsdecode(path))
+
+
+class SetWatcher:
+    """
+    Calls on_change(set_path) in a background thread for every set in
+    `folders` (and every file in `files`) that is added, changed or removed.
+    """
+
+    STATS_HELP = {
+        "events": "File change events seen for watched sets.",
+        "changes": "Changed sets handed to on_change.",
+        "errors": "Changed sets whose on_change raised.",
+        "pending": "Changed sets waiting for their debounce delay.",
+    }
+    STATS_GAUGES = ("pending",)
+
+    def __init__(self, folders: Iterable[str], on_change: Callable[[str], None],
+                 files: Iterable[str] = (), poll_seconds: float = POLL_SECONDS,
+                 debounce_seconds: float = DEBOUNCE_SECONDS, use_watchdog: bool = True):
+        self.folders = {os.path.abspath(f) for f in folders}
+        self.files = {os.path.abspath(f) for f in files}
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+        self.backend = "watchdog" if use_watchdog and Observer is not None else "polling"
+        self.events = 0
+        self.changes = 0
+        self.errors = 0
+        self._pending: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._observer = None
+        self._snapshot: Dict[str, Tuple[int, ...]] = {}
+
+    # ---------- Public API ----------
+
+    def start(self) -> "SetWatcher":
+        if self.backend == "watchdog":
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for folder in self.folders:
+                # Recursive so appends to the .journal subfolder are seen too
+                self._observer.schedule(handler, folder, recursive=True)
+            for folder in {os.path.dirname(f) for f in self.files} - self.folders:
+                self._observer.schedule(handler, folder, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            self._snapshot = self._scan()
+            self._spawn(self._poll, "set-watcher-poll")
+        self._spawn(self._run, "set-watcher")
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+
+    def notify(self, path: str) -> None:
+        """Note that path changed; ignored unless it belongs to a watched set."""
+        set_path = self.set_path(path)
+        if set_path is None:
+            return
+        with self._cond:
+            self.events += 1
+            self._pending[set_path] = time.monotonic()
+            self._cond.notify()
+
+    def set_path(self, path: str) -> Optional[str]:
+        """The set a changed file belongs to: the set itself or its journal."""
+        path = os.path.abspath(path)
+        if path in self.files:
+            return path
+        folder, filename = os.path.split(path)
+        if os.path.basename(folder) == JOURNAL_DIR and filename.endswith(".jsonl"):
+            folder, filename = os.path.dirname(folder), filename[:-len(".jsonl")]
+        if folder in self.folders and is_set_file(filename):
+            return os.path.join(folder, filename)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "events": self.events,
+                "changes": self.changes,
+                "errors": self.errors,
+                "pending": len(self._pending),
+            }
+
+    # ---------- Internals ----------
+
+    def _spawn(self, target: Callable[[], None], name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _run(self) -> None:
+        """Hand each changed set to on_change once it has been quiet for a moment."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped.is_set():
+                    self._cond.wait()
+                if self._stopped.is_set():
+                    return
+                now = time.monotonic()
+                quiet_since = now - self.debounce_seconds
+                ready = [p for p, t in self._pending.items() if t <= quiet_since]
+                if not ready:
+                    self._cond.wait(min(self._pending.values()) - quiet_since)
+                    continue
+                for path in ready:
+                    del self._pending[path]
+            for path in ready:
+                try:
+                    self.on_change(path)
+                except Exception:
+                    log.exception("refreshing %s after it changed", path)
+                    with self._cond:
+                        self.errors += 1
+                else:
+                    with self._cond:
+                        self.changes += 1
+
+    def _scan(self) -> Dict[str, Tuple[int, ...]]:
+        """Signature of every watched set (including its journal)."""
+        snapshot = {}
+        paths: Set[str] = set(self.files)
+        for folder in self.folders:
+            try:
+                paths.update(os.path.join(folder, n) for n in os.listdir(folder) if is_set_file(n))
+            except OSError:
+                continue
+        for path in paths:
+            try:
+                snapshot[path] = set_signature(path)
+            except OSError:
+                pass
+        return snapshot
+
+    def _poll(self) -> None:
+        while not self._stopped.wait(self.poll_seconds):
+            snapshot = self._scan()
+            previous, self._snapshot = self._snapshot, snapshot
+            for path in previous.keys() | snapshot.keys():
+                if previous.get(path) != snapshot.get(path):
+                    self.notify(path)
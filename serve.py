@@ -0,0 +1,104 @@
+"""
+Production entry point for the web app.
+
+    SECRET_KEY=... python serve.py --workers 4 --bind 0.0.0.0:8000
+
+Runs app.py under gunicorn with one process per worker (pip install
+gunicorn). Where gunicorn isn't available (Windows) it falls back to
+waitress, which serves from one process with several threads.
+
+Workers share everything through files in the sets folder and SQLite, so
+any worker can serve any request:
+
+- in-progress quizzes are kept in SQLite (QUIZ_STORE, default
+  quiz_app/quiz_state.db) instead of one worker's memory
+- writes to a set and to the catalog hold a lock file
+- a worker that writes a set announces it in the change feed, and the other
+  workers drop their cached copy on their next request
+
+Before the workers start, every set without an up-to-date pre-parsed copy is
+parsed with one process per core (quiz_app/warmup.py), so the first student
+to open a set after a deploy doesn't wait for it. --no-warmup skips this.
+
+Configuration comes from the environment: SECRET_KEY (required), QUIZ_STORE,
+SETS_FOLDER, QUIZ_DATA_DB, GRADING_STRICTNESS, MAX_UPLOAD_BYTES. Command
+line options override WORKERS, THREADS and BIND.
+"""
+
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUIZ_STORE = "sqlite:///" + os.path.join(BASE_DIR, "quiz_app", "quiz_state.db")
+
+
+def check_config(workers: int) -> None:
+    if not os.environ.get("SECRET_KEY"):
+        sys.exit("SECRET_KEY is not set. Every worker needs the same secret to read session cookies.")
+    configure_quiz_store(workers)
+
+
+def configure_quiz_store(workers: int) -> None:
+    """Keep quizzes in SQLite unless QUIZ_STORE says otherwise; memory needs one worker."""
+    os.environ.setdefault("QUIZ_STORE", DEFAULT_QUIZ_STORE)
+    if os.environ["QUIZ_STORE"] == "memory" and workers > 1:
+        sys.exit("QUIZ_STORE=memory only works with one worker; use sqlite:///path/to/quiz_state.db")
+
+
+def run_gunicorn(bind: str, workers: int, threads: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class FlashcardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            # Each worker imports the app itself, so no SQLite connection or
+            # lock file descriptor is shared across a fork
+            self.cfg.set("preload_app", False)
+
+        def load(self):
+            from app import app
+            return app
+
+    FlashcardApplication().run()
+
+
+def run_waitress(bind: str, threads: int) -> None:
+    from waitress import serve
+    from app import app
+
+    print("gunicorn not available; serving with waitress in a single process", file=sys.stderr)
+    serve(app, listen=bind, threads=threads)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the flashcard app with several workers.")
+    parser.add_argument("--bind", default=os.environ.get("BIND", "127.0.0.1:8000"))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("THREADS", 4)))
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="don't pre-parse the sets before starting")
+    args = parser.parse_args(argv)
+
+    check_config(args.workers)
+    sys.path.insert(0, BASE_DIR)
+    if not args.no_warmup:
+        from quiz_app.warmup import print_report, warm_up
+        print_report(warm_up(os.environ.get("SETS_FOLDER", "flashcard_sets")))
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        try:
+            import waitress  # noqa: F401
+        except ImportError:
+            sys.exit("Install gunicorn (or waitress on Windows) to run in production.")
+        run_waitress(args.bind, args.workers * args.threads)
+        return
+    run_gunicorn(args.bind, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()